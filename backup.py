@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+from snippet_io import SnippetWriter
+
+BACKUP_DIR = 'backups'
+STATE_FILE = 'backup_state.json'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'   # UTC, cùng định dạng CURRENT_TIMESTAMP của SQLite
+
+
+def _utc_now() -> str:
+    return time.strftime(TIME_FORMAT, time.gmtime())
+
+
+class BackupManager:
+    """Sao lưu định kỳ database snippets ở thread nền
+
+    - Snapshot: bản sao đầy đủ, nhất quán qua Database.backup_database (backup
+      API của SQLite, chép từng trang), giữ lại keep bản mới nhất.
+    - Thay đổi: file .jsonl.gz chỉ chứa các snippet có updated_at từ lần xuất
+      trước, import lại được bằng policy 'overwrite'. Snippet bị xóa chỉ
+      thể hiện qua snapshot.
+
+        backups = BackupManager(db)
+        backups.start()
+        ...
+        backups.stop()
+    """
+
+    SNAPSHOT_INTERVAL = 24 * 3600   # giây giữa hai snapshot
+    CHANGES_INTERVAL = 3600         # giây giữa hai lần xuất thay đổi
+    KEEP_SNAPSHOTS = 7
+    KEEP_CHANGES = 48
+
+    def __init__(self, db, backup_dir: Optional[str] = None, keep: int = KEEP_SNAPSHOTS,
+                 snapshot_interval: float = SNAPSHOT_INTERVAL,
+                 changes_interval: Optional[float] = CHANGES_INTERVAL):
+        self.db = db
+        # Mặc định: thư mục backups cạnh file database
+        self.backup_dir = backup_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db.db_path)), BACKUP_DIR
+        )
+        self.keep = keep
+        self.snapshot_interval = snapshot_interval
+        # None: không xuất thay đổi, chỉ chụp snapshot
+        self.changes_interval = changes_interval
+        self.name = os.path.splitext(os.path.basename(db.db_path))[0]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._force = False
+        self._thread = None
+        self.state = self._load_state()
+
+    # ========== TRẠNG THÁI ==========
+    def _state_path(self) -> str:
+        return os.path.join(self.backup_dir, STATE_FILE)
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self._state_path(), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        path = self._state_path()
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    # ========== SAO LƯU ==========
+    def _files(self, prefix: str, suffix: str) -> List[str]:
+        """Các file backup cùng loại, cũ nhất trước (tên chứa thời điểm tạo)"""
+        try:
+            names = os.listdir(self.backup_dir)
+        except OSError:
+            return []
+        return sorted(
+            os.path.join(self.backup_dir, name) for name in names
+            if name.startswith(prefix) and name.endswith(suffix)
+        )
+
+    def _rotate(self, prefix: str, suffix: str, keep: int) -> List[str]:
+        """Xóa các file cũ, chỉ giữ keep file mới nhất"""
+        files = self._files(prefix, suffix)
+        removed = files[:-keep] if keep > 0 else files
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️ Không xóa được backup cũ {path}: {e}")
+        return removed
+
+    def snapshot(self) -> str:
+        """Chụp một bản sao đầy đủ và xoay vòng các bản cũ, trả về đường dẫn"""
+        with self._lock:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(self.backup_dir, f"{self.name}-{stamp}.db")
+            # Thay đổi sau thời điểm này sẽ có trong lần xuất thay đổi tiếp theo
+            started = _utc_now()
+            self.db.backup_database(path)
+            self.state['last_snapshot'] = time.time()
+            self.state.setdefault('changes_since', started)
+            self._save_state()
+            self._rotate(f"{self.name}-", '.db', self.keep)
+            return path
+
+    def export_changes(self) -> Optional[str]:
+        """Xuất các snippet thay đổi từ lần xuất trước ra .jsonl.gz
+
+        Mốc bắt đầu là lần xuất trước hoặc snapshot đầu tiên; chưa có mốc nào
+        thì xuất toàn bộ. Trả về None nếu không có thay đổi nào.
+        """
+        with self._lock:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            since = self.state.get('changes_since')
+            # Mốc lấy trước khi đọc, so sánh >= với updated_at (thời điểm ghi,
+            # kể cả usage count ghi theo lô): ghi cùng giây với mốc sẽ được
+            # xuất lại lần sau, import overwrite không bị ảnh hưởng
+            started = _utc_now()
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(self.backup_dir, f"{self.name}-changes-{stamp}.jsonl.gz")
+            with SnippetWriter(path) as writer:
+                for row in self.db.iter_snippets(since=since):
+                    writer.write(row)
+            if not writer.count:
+                os.remove(path)
+                path = None
+            else:
+                print(f"💾 Đã xuất {writer.count} snippets thay đổi: {path}")
+            self.state['changes_since'] = started
+            self.state['last_changes'] = time.time()
+            self._save_state()
+            self._rotate(f"{self.name}-changes-", '.jsonl.gz', self.KEEP_CHANGES)
+            return path
+
+    # ========== LỊCH CHẠY ==========
+    def _due(self, key: str, interval: Optional[float]) -> Optional[float]:
+        """Số giây tới lần chạy tiếp theo (<= 0 là đến hạn), None nếu tắt"""
+        if interval is None:
+            return None
+        return self.state.get(key, 0) + interval - time.time()
+
+    def run_pending(self, force: bool = False):
+        """Chạy các việc sao lưu đã đến hạn (force: chụp snapshot ngay)"""
+        due = self._due('last_snapshot', self.snapshot_interval)
+        if force or (due is not None and due <= 0):
+            self.snapshot()
+        due = self._due('last_changes', self.changes_interval)
+        if due is not None and due <= 0:
+            self.export_changes()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            force, self._force = self._force, False
+            try:
+                self.run_pending(force)
+            except Exception as e:
+                print(f"❌ Lỗi khi sao lưu: {e}")
+            waits = [due for due in (self._due('last_snapshot', self.snapshot_interval),
+                                     self._due('last_changes', self.changes_interval))
+                     if due is not None]
+            # Lỗi (vd đĩa đầy) thì thử lại sau một phút thay vì lặp liên tục
+            self._wake.wait(max(60.0, min(waits)) if waits else None)
+            self._wake.clear()
+        self.db.release_connection()
+
+    def start(self):
+        """Bắt đầu thread sao lưu (chạy ngay nếu đã quá hạn)"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="BackupManager")
+        self._thread.start()
+
+    def backup_now(self):
+        """Yêu cầu thread nền chụp snapshot ngay (không chờ)"""
+        self._force = True
+        if self._thread is None:
+            self.start()
+        else:
+            self._wake.set()
+
+    def stop(self):
+        """Dừng thread nền (chờ lượt sao lưu đang chạy xong)"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
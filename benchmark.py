@@ -0,0 +1,473 @@
+"""Benchmark không cần màn hình/bàn phím cho bộ thay thế text
+
+Chạy TextExpander với luồng phím giả lập qua Controller và Listener giả
+(module pynput giả luôn được dùng để benchmark không bao giờ gõ phím thật),
+rồi in kết quả dạng JSON để so sánh giữa các lần chạy:
+
+    python benchmark.py                      # in JSON ra stdout
+    python benchmark.py -o bench.json        # ghi ra file
+    python benchmark.py --quick              # kích thước nhỏ, chạy nhanh
+"""
+import argparse
+import contextlib
+import enum
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import string
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+
+
+# ========== PYNPUT GIẢ ==========
+def install_fake_pynput():
+    """Thay pynput bằng module giả: Controller chỉ đếm phím, Listener không hook gì"""
+
+    class Key(enum.Enum):
+        alt = 1; alt_l = 2; alt_r = 3; alt_gr = 4
+        backspace = 5; caps_lock = 6; cmd = 7; cmd_l = 8; cmd_r = 9
+        ctrl = 10; ctrl_l = 11; ctrl_r = 12; delete = 13; down = 14
+        end = 15; enter = 16; esc = 17; home = 18; insert = 19
+        left = 20; page_down = 21; page_up = 22; right = 23
+        shift = 24; shift_l = 25; shift_r = 26; space = 27; tab = 28; up = 29
+
+    class KeyCode:
+        __slots__ = ('char', 'vk')
+
+        def __init__(self, vk=None, char=None):
+            self.vk = vk
+            self.char = char
+
+        @classmethod
+        def from_char(cls, char):
+            return cls(char=char)
+
+        def __eq__(self, other):
+            return isinstance(other, KeyCode) and other.char == self.char and other.vk == self.vk
+
+        def __hash__(self):
+            return hash((self.char, self.vk))
+
+        def __repr__(self):
+            return f"'{self.char}'"
+
+    class Controller:
+        """Đếm phím gõ ra; nếu có listener thì phát lại phím như hook hệ điều hành"""
+
+        def __init__(self):
+            self.presses = 0
+            self.listener = None
+
+        def press(self, key):
+            self.presses += 1
+            if self.listener is not None:
+                self.listener.on_press(key if not isinstance(key, str) else KeyCode.from_char(key))
+
+        def release(self, key):
+            if self.listener is not None:
+                self.listener.on_release(key if not isinstance(key, str) else KeyCode.from_char(key))
+
+        def type(self, text):
+            for ch in text:
+                self.press(ch)
+                self.release(ch)
+
+        @contextlib.contextmanager
+        def pressed(self, *keys):
+            for key in keys:
+                self.press(key)
+            try:
+                yield
+            finally:
+                for key in reversed(keys):
+                    self.release(key)
+
+    class Listener:
+        def __init__(self, on_press=None, on_release=None, **kwargs):
+            self.on_press = on_press
+            self.on_release = on_release
+
+        def start(self):
+            pass
+
+        def join(self, timeout=None):
+            pass
+
+        def stop(self):
+            pass
+
+    keyboard = types.ModuleType('pynput.keyboard')
+    keyboard.Key = Key
+    keyboard.KeyCode = KeyCode
+    keyboard.Controller = Controller
+    keyboard.Listener = Listener
+    pynput = types.ModuleType('pynput')
+    pynput.keyboard = keyboard
+    sys.modules['pynput'] = pynput
+    sys.modules['pynput.keyboard'] = keyboard
+
+
+install_fake_pynput()
+
+import logging  # noqa: E402
+
+from logging_setup import setup_logging  # noqa: E402
+
+# Log từng lần thay thế làm sai lệch kết quả; không tạo file log ở thư mục hiện tại
+setup_logging(logging.WARNING, log_file=os.devnull)
+
+from pynput.keyboard import Key, KeyCode  # noqa: E402
+from database import Database  # noqa: E402
+from keyboard_listener import TextExpander  # noqa: E402
+from matcher import KeywordMatcher  # noqa: E402
+from metrics import metrics  # noqa: E402
+from snippet_io import SnippetReader  # noqa: E402
+from vietnamese import remove_accents  # noqa: E402
+
+SIZES = (10, 100, 1000, 10000, 100000)
+QUICK_SIZES = (10, 100, 1000)
+VIETNAMESE_WORDS = ('chào', 'cảm ơn', 'xin lỗi', 'địa chỉ', 'số điện thoại', 'hẹn gặp')
+
+
+# ========== DỮ LIỆU GIẢ ==========
+def make_snippets(count: int, rng: random.Random):
+    """count cặp (keyword, content) không trùng keyword (kể cả sau khi bỏ dấu)"""
+    seen = set()
+    snippets = []
+    while len(snippets) < count:
+        if rng.random() < 0.1:
+            keyword = rng.choice(VIETNAMESE_WORDS).replace(' ', '') + str(rng.randrange(count * 10))
+        else:
+            keyword = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+        folded = remove_accents(keyword)
+        if folded in seen:
+            continue
+        seen.add(folded)
+        content = ' '.join(
+            ''.join(rng.choices(string.ascii_letters, k=rng.randint(2, 9)))
+            for _ in range(rng.randint(3, 30))
+        )
+        snippets.append((keyword, content))
+    return snippets
+
+
+def forget_database(path: str):
+    """Bỏ index/usage writer dùng chung của database để giải phóng bộ nhớ"""
+    key = os.path.abspath(path)
+    writer = Database._usage_writers.pop(key, None)
+    if writer is not None:
+        writer.close()
+    Database._indexes.pop(key, None)
+
+
+def fill_database(path: str, snippets):
+    """Ghi thẳng snippets vào database (nhanh hơn add_snippet từng cái)"""
+    Database(path).close()
+    forget_database(path)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO snippets (keyword, keyword_folded, content) VALUES (?, ?, ?)",
+            [(k, remove_accents(k), c) for k, c in snippets]
+        )
+    conn.close()
+
+
+def make_stream(snippets, words: int, hit_ratio: float, rng: random.Random):
+    """Các từ người dùng gõ: hit_ratio phần là keyword, còn lại là từ thường"""
+    keywords = [k for k, _ in snippets]
+    stream = []
+    for _ in range(words):
+        if rng.random() < hit_ratio:
+            stream.append(rng.choice(keywords))
+        else:
+            stream.append(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) + 'q')
+    return stream
+
+
+def create_expander(path: str) -> TextExpander:
+    expander = TextExpander(path)
+    # Không nghỉ giữa các phím, không đụng tới clipboard thật
+    profile = expander.pacer.profile('')
+    profile.key_delay = 0.0
+    profile.chunk_size = 1024
+    expander.injector.chunked.chunk_delay = 0.0
+    expander.injector.clipboard.clipboard = None
+    return expander
+
+
+# ========== BENCHMARK BỘ THAY THẾ ==========
+def bench_throughput(workdir: str, snippet_count: int, words: int, rng: random.Random):
+    """Phím/giây qua đúng đường đi thật: listener → hàng đợi → worker → gõ ra
+
+    Phím do Controller gõ ra được phát lại vào listener như hook hệ điều hành,
+    nên worker cũng phải lọc echo như khi chạy thật.
+    """
+    path = os.path.join(workdir, 'throughput.db')
+    snippets = make_snippets(snippet_count, rng)
+    fill_database(path, snippets)
+    expander = create_expander(path)
+    expander.controller.listener = expander
+
+    events = []
+    for word in make_stream(snippets, words, 0.2, rng):
+        for ch in word:
+            key = KeyCode.from_char(ch)
+            events.append(key)
+        events.append(Key.space)
+
+    metrics.reset()
+    worker = threading.Thread(target=expander.process_events, name="ExpansionWorker")
+    worker.start()
+
+    started = time.perf_counter()
+    for key in events:
+        expander.on_press(key)
+        expander.on_release(key)
+    expander.events.put(None)
+    worker.join()
+    elapsed = time.perf_counter() - started
+
+    snapshot = metrics.snapshot()
+    expander.db.close()
+    forget_database(path)
+    return {
+        'snippets': snippet_count,
+        'user_keys': len(events),
+        'injected_keys': expander.controller.presses,
+        'expansions': snapshot['counters']['expansions'],
+        'elapsed_sec': elapsed,
+        'keys_per_sec': len(events) / elapsed,
+        'key_queue': snapshot['latency']['key_queue'],
+        'key_handling': snapshot['latency']['key_handling'],
+    }
+
+
+def bench_latency(workdir: str, snippet_count: int, expansions: int, rng: random.Random):
+    """Độ trễ trigger → phím đầu tiên / gõ xong, gõ từng từ một (hàng đợi rỗng)"""
+    path = os.path.join(workdir, 'latency.db')
+    snippets = make_snippets(snippet_count, rng)
+    fill_database(path, snippets)
+    expander = create_expander(path)
+
+    metrics.reset()
+    for word in make_stream(snippets, expansions, 1.0, rng):
+        for ch in word:
+            expander.handle_press(KeyCode.from_char(ch), time.perf_counter())
+        expander.handle_press(Key.space, time.perf_counter())
+
+    snapshot = metrics.snapshot()
+    expander.db.close()
+    forget_database(path)
+    return {
+        'snippets': snippet_count,
+        'expansions': snapshot['counters']['expansions'],
+        'lookup': snapshot['latency']['lookup'],
+        'trigger_to_first_key': snapshot['latency']['trigger_to_first_key'],
+        'trigger_to_done': snapshot['latency']['trigger_to_done'],
+    }
+
+
+def bench_lookup(workdir: str, sizes, probes: int, rng: random.Random):
+    """Chi phí tìm snippet khi trigger theo số lượng snippet"""
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f'lookup_{size}.db')
+        snippets = make_snippets(size, rng)
+        fill_database(path, snippets)
+
+        started = time.perf_counter()
+        expander = create_expander(path)
+        startup = time.perf_counter() - started
+
+        words = make_stream(snippets, probes, 0.5, rng)
+        states = [expander.get_buffer_state(word) for word in words]
+        started = time.perf_counter()
+        hits = 0
+        for word, state in zip(words, states):
+            if expander.find_match(word, state):
+                hits += 1
+        lookup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for word in words:
+            expander.get_buffer_state(word)
+        feed = time.perf_counter() - started
+
+        results.append({
+            'snippets': size,
+            'startup_sec': startup,
+            'lookup_us': lookup / probes * 1e6,
+            'feed_us_per_word': feed / probes * 1e6,
+            'hit_ratio': hits / probes,
+        })
+        expander.db.close()
+        forget_database(path)
+        del expander
+        gc.collect()
+    return results
+
+
+def bench_memory(workdir: str, sizes, rng: random.Random):
+    """Bộ nhớ của index + automaton tính trên mỗi snippet"""
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f'memory_{size}.db')
+        snippets = make_snippets(size, rng)
+        fill_database(path, snippets)
+        gc.collect()
+
+        tracemalloc.start()
+        db = Database(path)
+        index_bytes = tracemalloc.get_traced_memory()[0]
+        matcher = KeywordMatcher(db.index.keywords(), normalize=remove_accents)
+        total_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        results.append({
+            'snippets': size,
+            'index_bytes_per_snippet': index_bytes / size,
+            'matcher_bytes_per_snippet': (total_bytes - index_bytes) / size,
+            'total_bytes_per_snippet': total_bytes / size,
+        })
+        del matcher
+        db.close()
+        forget_database(path)
+        gc.collect()
+    return results
+
+
+# ========== BENCHMARK DATABASE ==========
+def rate(count: int, elapsed: float) -> dict:
+    return {'count': count, 'elapsed_sec': elapsed, 'ops_per_sec': count / elapsed if elapsed else None}
+
+
+def bench_database(workdir: str, count: int, rng: random.Random):
+    """Thông lượng thêm/đọc/sửa/xóa, tìm kiếm và import"""
+    path = os.path.join(workdir, 'crud.db')
+    db = Database(path)
+    snippets = make_snippets(count, rng)
+    results = {}
+
+    started = time.perf_counter()
+    for keyword, content in snippets:
+        db.add_snippet(keyword, content)
+    results['add'] = rate(count, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for keyword, _ in snippets:
+        db.get_snippet(keyword)
+    results['get'] = rate(count, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for keyword, content in snippets:
+        db.update_snippet(keyword, content[::-1])
+    results['update'] = rate(count, time.perf_counter() - started)
+
+    queries = [keyword[:2] for keyword, _ in rng.sample(snippets, min(200, count))]
+    started = time.perf_counter()
+    returned = 0
+    for query in queries:
+        returned += len(db.search_snippets(query))
+    results['search'] = rate(len(queries), time.perf_counter() - started)
+    results['search']['avg_results'] = returned / len(queries)
+
+    started = time.perf_counter()
+    db.get_all_snippets()
+    results['get_all_sec'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for keyword, _ in snippets:
+        db.delete_snippet(keyword)
+    results['delete'] = rate(count, time.perf_counter() - started)
+
+    # Import như cửa sổ quản lý: đọc stream bằng SnippetReader, ghi theo lô
+    export_path = os.path.join(workdir, 'import.json')
+    with open(export_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(snippets), f, ensure_ascii=False)
+    started = time.perf_counter()
+    with SnippetReader(export_path) as reader:
+        counts = db.import_snippets(reader)
+    results['import'] = rate(counts['added'], time.perf_counter() - started)
+
+    db.close()
+    forget_database(path)
+    return results
+
+
+# ========== CHẠY ==========
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    sizes = [size for size in (QUICK_SIZES if args.quick else SIZES) if size <= args.max_snippets]
+    workdir = tempfile.mkdtemp(prefix='text_expander_bench_')
+    results = {}
+    try:
+        # Database/TextExpander in thông báo ra stdout; giữ stdout cho JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            steps = [
+                ('throughput', lambda: bench_throughput(workdir, 1000, args.words, rng)),
+                ('latency', lambda: bench_latency(workdir, 1000, args.expansions, rng)),
+                ('lookup', lambda: bench_lookup(workdir, sizes, args.probes, rng)),
+                ('memory', lambda: bench_memory(workdir, sizes, rng)),
+                ('database', lambda: bench_database(workdir, args.crud, rng)),
+            ]
+            for name, step in steps:
+                if args.only and name not in args.only:
+                    continue
+                print(f"⏱️ {name}...", file=sys.stderr)
+                results[name] = step()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Text Expander (không cần màn hình)")
+    parser.add_argument('-o', '--output', help="ghi JSON ra file thay vì stdout")
+    parser.add_argument('--quick', action='store_true', help="kích thước nhỏ để chạy nhanh")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--max-snippets', type=int, default=max(SIZES))
+    parser.add_argument('--words', type=int, default=5000, help="số từ gõ khi đo phím/giây")
+    parser.add_argument('--expansions', type=int, default=500, help="số lần thay thế khi đo độ trễ")
+    parser.add_argument('--probes', type=int, default=5000, help="số lần tìm khi đo chi phí tìm")
+    parser.add_argument('--crud', type=int, default=2000, help="số snippet khi đo database")
+    parser.add_argument('--only', nargs='+',
+                        choices=['throughput', 'latency', 'lookup', 'memory', 'database'])
+    args = parser.parse_args()
+    if args.quick:
+        args.words = min(args.words, 1000)
+        args.expansions = min(args.expansions, 100)
+        args.probes = min(args.probes, 1000)
+        args.crud = min(args.crud, 300)
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"✅ Đã ghi kết quả vào {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
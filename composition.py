@@ -0,0 +1,145 @@
+from key_buffer import KeyBuffer
+from vietnamese import remove_accents
+
+
+class CompositionTracker:
+    """Dựng lại chữ đang gõ khi có bộ gõ tiếng Việt (Unikey, EVKey... Telex/VNI)
+
+    Bộ gõ sửa chữ bằng một loạt phím giả lập ngay sau phím người dùng:
+    vài backspace rồi các ký tự thay thế ("ca" + "s" → ⌫ "á"). Mọi phím đều
+    được áp dụng vào buffer (không bỏ phím nào); loạt phím đến cách phím trước
+    chưa tới BURST_WINDOW và bắt đầu bằng backspace được coi là bộ gõ sửa chữ.
+
+    Khi loạt sửa kết thúc, kiểm tra phím người dùng vừa gõ có bị bộ gõ "nuốt"
+    (không hiện ra màn hình) hay không: giả thuyết nào mà ký tự bị xóa khớp
+    (sau khi bỏ dấu) với ký tự thay thế thì được chọn, rồi sửa lại buffer cho
+    đúng với chữ trên màn hình.
+
+    Song song đó giữ `raw`: các phím người dùng thực sự gõ trong từ hiện tại
+    (vd "dd" trong khi màn hình là "đ"), để keyword gõ theo kiểu Telex/VNI
+    vẫn tìm được.
+    """
+
+    __slots__ = ('buffer', 'raw', 'swallows', '_last_at', '_user_key',
+                 '_user_tail', '_user_index', '_in_burst', '_burst_backspaces',
+                 '_burst_chars', '_burst_mixed')
+
+    # Khoảng cách tối đa giữa các phím trong một loạt sửa của bộ gõ; người
+    # dùng dù gõ nhanh cũng không nhấn hai phím cách nhau dưới mức này
+    BURST_WINDOW = 0.012
+    # Số ký tự trước phím người dùng được giữ lại để kiểm tra loạt sửa
+    TAIL = 4
+
+    def __init__(self, buffer: KeyBuffer):
+        self.buffer = buffer
+        self.raw = []
+        # Bộ gõ có nuốt phím gốc hay không (học từ các loạt sửa rõ ràng)
+        self.swallows = True
+        self._last_at = float('-inf')
+        self._user_key = None
+        self._user_tail = ''
+        self._user_index = 0
+        self._in_burst = False
+        self._burst_backspaces = 0
+        self._burst_chars = []
+        self._burst_mixed = False
+
+    def reset(self):
+        self.finish()
+        self.raw.clear()
+        self._user_key = None
+        self._last_at = float('-inf')
+
+    def resync(self):
+        """Đồng bộ raw theo chữ hiện tại (sau khi sửa tay, di chuyển con trỏ...)"""
+        self.finish()
+        self.raw[:] = self.buffer.before_cursor()
+        self._user_key = None
+
+    def on_char(self, ch: str, at: float):
+        if self._in_burst and at - self._last_at < self.BURST_WINDOW:
+            # Ký tự thay thế của bộ gõ
+            self._burst_chars.append(ch)
+            self.buffer.append(ch)
+            self._last_at = at
+            return
+
+        self.finish()
+        self._user_key = ch
+        self._user_tail = self.buffer.before_cursor(self.TAIL)
+        self._user_index = self.buffer.cursor
+        self.buffer.append(ch)
+        self.raw.append(ch)
+        self._last_at = at
+
+    def is_ime_backspace(self, at: float) -> bool:
+        """Backspace đến lúc at có phải bộ gõ xóa để sửa chữ (không phải người dùng)"""
+        return self._user_key is not None and at - self._last_at < self.BURST_WINDOW
+
+    def on_backspace(self, at: float):
+        if self.is_ime_backspace(at):
+            # Bộ gõ xóa chữ cũ để thay bằng chữ có dấu
+            if not self._in_burst:
+                self._in_burst = True
+                self._burst_backspaces = 0
+                self._burst_chars = []
+                self._burst_mixed = False
+            elif self._burst_chars:
+                self._burst_mixed = True
+            self._burst_backspaces += 1
+            self.buffer.backspace()
+            self._last_at = at
+            return
+
+        # Người dùng tự xóa
+        self.finish()
+        self.buffer.backspace()
+        self.raw[:] = self.buffer.before_cursor()
+        self._user_key = None
+        self._last_at = at
+
+    @staticmethod
+    def _consistent(deleted, inserted: str) -> bool:
+        """Chữ thay thế có cùng gốc (bỏ dấu) với chữ bị xóa không"""
+        if not deleted:
+            return False
+        return remove_accents(inserted).lower().startswith(remove_accents(deleted).lower())
+
+    def finish(self):
+        """Kết thúc loạt sửa đang chờ (gọi trước khi đọc buffer)"""
+        if not self._in_burst:
+            return
+        self._in_burst = False
+        backspaces = self._burst_backspaces
+        if not backspaces or self._burst_mixed or self._user_key is None:
+            return
+
+        tail = self._user_tail
+        inserted = ''.join(self._burst_chars)
+        if backspaces <= len(tail) + 1:
+            shown = self._consistent((tail + self._user_key)[-backspaces:], inserted)
+        else:
+            shown = False
+        if backspaces <= len(tail):
+            swallowed = self._consistent(tail[-backspaces:], inserted)
+        else:
+            swallowed = False
+
+        if swallowed and (self.swallows or not shown):
+            self.swallows = True
+            # Phím gốc không hiện ra: buffer đang thừa ký tự tại (vị trí phím - backspaces)
+            self._remove_at(self._user_index - backspaces)
+        elif shown and not swallowed:
+            self.swallows = False
+
+    def _remove_at(self, index: int):
+        buffer = self.buffer
+        distance = buffer.cursor - (index + 1)
+        if index < 0 or distance < 0 or not buffer.move(-distance):
+            return
+        buffer.backspace()
+        buffer.move(distance)
+
+    def raw_word(self) -> str:
+        """Các phím người dùng đã gõ trong từ hiện tại"""
+        return ''.join(self.raw)
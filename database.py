@@ -1,160 +1,860 @@
 import sqlite3
 import os
-from typing import Optional, List, Tuple
+import re
+import sys
+import threading
+import time
+import weakref
+from typing import Callable, Optional, List, Tuple
+from vietnamese import remove_accents
+from metrics import metrics
+from migrations import migrate, schema_version
+
+DB_FILE = "snippets.db"
+
+
+def default_db_path() -> str:
+    """snippets.db cạnh file exe (bản đóng gói) hoặc cạnh mã nguồn
+    
+    Không phụ thuộc thư mục hiện tại lúc chạy ứng dụng.
+    """
+    if getattr(sys, 'frozen', False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, DB_FILE)
+
+
+class SnippetIndex:
+    """Bản sao keyword → content nằm trong bộ nhớ để tra cứu khi gõ phím
+    
+    Có thể đăng ký callback(event, keyword) để nhận thay đổi, với event là
+    'add', 'update', 'remove' hoặc 'load' (keyword = None khi nạp lại toàn bộ).
+    """
+    
+    def __init__(self):
+        self._contents = {}
+        self._by_folded = {}  # keyword đã bỏ dấu -> các keyword gốc
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.loaded = False
+    
+    def subscribe(self, callback):
+        """Đăng ký nhận thay đổi của index"""
+        self._listeners.append(callback)
+    
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, event: str, keyword: Optional[str]):
+        for callback in list(self._listeners):
+            try:
+                callback(event, keyword)
+            except Exception as e:
+                print(f"Lỗi trong listener của index: {e}")
+    
+    def load(self, rows):
+        """Nạp toàn bộ snippets (thay thế dict một lần, không khóa người đọc)"""
+        contents = {}
+        by_folded = {}
+        for row in rows:
+            contents[row['keyword']] = row['content']
+            by_folded.setdefault(row['keyword_folded'], []).append(row['keyword'])
+        with self._lock:
+            self._contents = contents
+            self._by_folded = by_folded
+            self.loaded = True
+        self._notify('load', None)
+    
+    def get(self, keyword: str) -> Optional[str]:
+        """Tra cứu O(1), không chạm tới đĩa"""
+        return self._contents.get(keyword)
+    
+    def match(self, text: str) -> Optional[Tuple[str, str]]:
+        """Tra cứu theo dạng bỏ dấu bằng một lần probe, trả về (keyword, content)
+        
+        Khi nhiều keyword có cùng dạng bỏ dấu: ưu tiên keyword không dấu,
+        sau đó keyword trùng đúng text đã gõ.
+        """
+        folded = remove_accents(text)
+        keywords = self._by_folded.get(folded)
+        if not keywords:
+            return None
+        if len(keywords) == 1:
+            keyword = keywords[0]
+        elif folded in keywords:
+            keyword = folded
+        elif text in keywords:
+            keyword = text
+        else:
+            keyword = keywords[0]
+        content = self._contents.get(keyword)
+        return (keyword, content) if content is not None else None
+    
+    def set(self, keyword: str, content: str):
+        with self._lock:
+            existed = keyword in self._contents
+            self._contents[keyword] = content
+            if not existed:
+                self._by_folded.setdefault(remove_accents(keyword), []).append(keyword)
+        self._notify('update' if existed else 'add', keyword)
+    
+    def remove(self, keyword: str):
+        with self._lock:
+            removed = self._contents.pop(keyword, None) is not None
+            if removed:
+                folded = remove_accents(keyword)
+                keywords = [k for k in self._by_folded.get(folded, ()) if k != keyword]
+                if keywords:
+                    self._by_folded[folded] = keywords
+                else:
+                    self._by_folded.pop(folded, None)
+        if removed:
+            self._notify('remove', keyword)
+    
+    def keywords(self) -> List[str]:
+        return list(self._contents)
+    
+    def __len__(self):
+        return len(self._contents)
+    
+    def __contains__(self, keyword):
+        return keyword in self._contents
+
+
+class UsageWriter:
+    """Gom các lần dùng snippet trong bộ nhớ và ghi xuống database theo lô
+    
+    Hot path chỉ gọi record() (một thao tác dict), thread nền sẽ flush trong
+    một transaction mỗi flush_interval giây hoặc khi đủ flush_threshold lần dùng.
+    """
+    
+    def __init__(self, connect, flush_interval=5.0, flush_threshold=50):
+        self._connect = connect
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = {}  # keyword -> [số lần dùng, last_used]
+        self._pending_hits = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def record(self, keyword: str):
+        """Ghi nhận một lần dùng (không chờ database)"""
+        # Cùng định dạng UTC với CURRENT_TIMESTAMP của SQLite
+        now = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        with self._lock:
+            entry = self._pending.get(keyword)
+            if entry is None:
+                self._pending[keyword] = [1, now]
+            else:
+                entry[0] += 1
+                entry[1] = now
+            self._pending_hits += 1
+            full = self._pending_hits >= self.flush_threshold
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="UsageWriter"
+                )
+                self._thread.start()
+        if full:
+            self._wake.set()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+    
+    def flush(self) -> int:
+        """Ghi tất cả lần dùng đang chờ trong một transaction, trả về số keyword đã ghi"""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._pending_hits = 0
+            if not pending:
+                return 0
+            
+            rows = [(count, last_used, keyword)
+                    for keyword, (count, last_used) in pending.items()]
+            try:
+                conn = self._connect()
+                with conn:
+                    # last_used là lúc dùng, updated_at là lúc ghi: backup tăng
+                    # dần so với mốc lấy theo giờ ghi nên không bỏ sót lô này
+                    conn.executemany('''
+                        UPDATE snippets 
+                        SET usage_count = usage_count + ?,
+                            last_used = ?,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE keyword = ?
+                    ''', rows)
+            except sqlite3.OperationalError as e:
+                # Database đang bị khóa: trả lại hàng đợi để lần sau ghi tiếp
+                print(f"Không ghi được usage count, sẽ thử lại: {e}")
+                with self._lock:
+                    for keyword, (count, last_used) in pending.items():
+                        entry = self._pending.setdefault(keyword, [0, last_used])
+                        entry[0] += count
+                        self._pending_hits += count
+                return 0
+            return len(rows)
+    
+    def close(self):
+        """Dừng thread nền và flush phần còn lại"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+class _ThreadConnection:
+    """Kết nối của một thread, giữ trong threading.local"""
+    
+    __slots__ = ('conn', 'release', '__weakref__')
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.release = None
+
 
 class Database:
+    # Mỗi file database có một index và một usage writer dùng chung cho mọi
+    # instance trong process, để thay đổi từ cửa sổ quản lý thấy ngay ở
+    # keyboard listener
+    _indexes = {}
+    _usage_writers = {}
+    _instances = {}
+    _creating = {}                  # đường dẫn -> khóa khi tạo instance dùng chung
+    _shared_lock = threading.Lock()
+    
+    # Cấu hình kết nối
+    BUSY_TIMEOUT = 5.0              # giây chờ khi database đang bị khóa
+    CACHED_STATEMENTS = 256         # số prepared statement giữ lại mỗi kết nối
+    MMAP_SIZE = 64 * 1024 * 1024    # 64MB
+    
     def __init__(self, db_path="snippets.db"):
         self.db_path = db_path
+        # Mỗi thread giữ một kết nối riêng, mở một lần và dùng lại
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_database()
+        self.index = self._get_index()
+        self.usage_writer = self._get_usage_writer()
+    
+    @classmethod
+    def shared(cls, db_path: Optional[str] = None) -> 'Database':
+        """Instance dùng chung cho cả process (mặc định default_db_path())
+        
+        Tray, keyboard listener và cửa sổ quản lý cùng dùng một instance nên
+        schema chỉ khởi tạo một lần và thay đổi thấy ngay ở mọi nơi.
+        """
+        key = os.path.abspath(db_path or default_db_path())
+        with cls._shared_lock:
+            db = cls._instances.get(key)
+            if db is not None:
+                return db
+            creating = cls._creating.setdefault(key, threading.Lock())
+        # Mỗi đường dẫn một khóa riêng: thread đến sau chờ instance đang tạo
+        # thay vì tạo thêm một bản nữa (_get_index vẫn lấy được _shared_lock)
+        with creating:
+            with cls._shared_lock:
+                db = cls._instances.get(key)
+            if db is None:
+                db = cls(key)
+                with cls._shared_lock:
+                    cls._instances[key] = db
+        return db
+    
+    def _get_index(self) -> SnippetIndex:
+        """Lấy (và nạp lần đầu) index dùng chung theo đường dẫn tuyệt đối"""
+        key = os.path.abspath(self.db_path)
+        with Database._shared_lock:
+            index = Database._indexes.get(key)
+            if index is None:
+                index = Database._indexes[key] = SnippetIndex()
+        if not index.loaded:
+            self.reload_index(index)
+        return index
+    
+    def _get_usage_writer(self) -> UsageWriter:
+        """Lấy usage writer dùng chung theo đường dẫn tuyệt đối"""
+        key = os.path.abspath(self.db_path)
+        with Database._shared_lock:
+            writer = Database._usage_writers.get(key)
+            if writer is None:
+                writer = Database._usage_writers[key] = UsageWriter(self.get_connection)
+        return writer
+    
+    def reload_index(self, index: Optional[SnippetIndex] = None):
+        """Nạp lại index từ database"""
+        if index is None:
+            index = self.index
+        conn = self.get_connection()
+        index.load(conn.execute("SELECT keyword, keyword_folded, content FROM snippets"))
+    
+    def subscribe(self, callback):
+        """Đăng ký callback(event, keyword) nhận thay đổi snippets
+        
+        event là 'add', 'update', 'remove' (kèm keyword) hoặc 'load' (nạp lại
+        toàn bộ, keyword = None). Callback chạy trên thread đã thay đổi
+        database, ngay sau khi ghi xong.
+        """
+        self.index.subscribe(callback)
+    
+    def unsubscribe(self, callback):
+        self.index.unsubscribe(callback)
     
     def get_connection(self):
-        """Tạo kết nối đến database"""
-        conn = sqlite3.connect(self.db_path)
+        """Lấy kết nối của thread hiện tại (tạo và cấu hình ở lần gọi đầu)
+        
+        Thread kết thúc thì threading.local bỏ holder của nó và finalizer
+        đóng kết nối, nên thread ngắn hạn (QThreadPool, backup) không để lại
+        kết nối mở.
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            conn = self._open_connection()
+            holder = _ThreadConnection(conn)
+            holder.release = weakref.finalize(holder, self._discard_connection, conn)
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.append(conn)
+        return holder.conn
+    
+    def release_connection(self):
+        """Đóng kết nối của thread hiện tại (gọi khi tác vụ nền kết thúc)"""
+        holder = getattr(self._local, 'holder', None)
+        if holder is not None:
+            del self._local.holder
+            holder.release()
+    
+    def _discard_connection(self, conn):
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def _open_connection(self):
+        """Mở kết nối mới với WAL và các pragma tối ưu"""
+        # check_same_thread=False chỉ để close_connections() đóng được từ
+        # thread khác; mỗi kết nối vẫn chỉ được dùng bởi thread sở hữu nó
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.BUSY_TIMEOUT,
+            cached_statements=self.CACHED_STATEMENTS,
+            check_same_thread=False
+        )
         conn.row_factory = sqlite3.Row  # Để truy cập theo tên cột
+        # WAL: người đọc không chặn người ghi và ngược lại
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Với WAL, NORMAL vẫn an toàn khi crash ứng dụng và bỏ fsync mỗi commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
         return conn
     
+    def close_connections(self):
+        """Đóng tất cả kết nối đã mở"""
+        with self._connections_lock:
+            connections = self._connections
+            self._connections = []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
     def init_database(self):
-        """Khởi tạo database nếu chưa tồn tại"""
+        """Tạo mới hoặc nâng cấp schema lên phiên bản mới nhất (xem migrations)"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Bảng snippets
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS snippets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            keyword TEXT UNIQUE NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            usage_count INTEGER DEFAULT 0,
-            last_used TIMESTAMP
-        )
-        ''')
         
-        # Tạo index cho tìm kiếm nhanh
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_keyword ON snippets(keyword)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_usage ON snippets(usage_count)')
+        applied = migrate(conn)
+        # Không có FTS5 thì bảng không được tạo, tìm kiếm dùng LIKE
+        self.has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snippets_fts'"
+        ).fetchone() is not None
         
-        conn.commit()
-        conn.close()
-        print(f"Database initialized: {self.db_path}")
+        if applied:
+            print(f"Database initialized: {self.db_path} (phiên bản {schema_version(conn)})")
+        else:
+            print(f"Database initialized: {self.db_path}")
     
     def add_snippet(self, keyword: str, content: str) -> bool:
         """Thêm snippet mới"""
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO snippets (keyword, content) VALUES (?, ?)",
-                (keyword, content)
-            )
-            conn.commit()
-            conn.close()
+            with conn:
+                conn.execute(
+                    '''INSERT INTO snippets (keyword, keyword_folded, content, updated_at)
+                       VALUES (?, ?, ?, CURRENT_TIMESTAMP)''',
+                    (keyword, remove_accents(keyword), content)
+                )
+            self.index.set(keyword, content)
             return True
         except sqlite3.IntegrityError:
             print(f"Keyword '{keyword}' đã tồn tại")
             return False
     
+    def lookup_folded(self, text: str) -> Optional[Tuple[str, str]]:
+        """Tra cứu theo keyword đã bỏ dấu trong index bộ nhớ, trả về (keyword, content)"""
+        started = time.perf_counter()
+        found = self.index.match(text)
+        metrics.record('index_lookup', time.perf_counter() - started)
+        return found
+    
+    def record_usage(self, keyword: str):
+        """Ghi nhận một lần dùng snippet (ghi xuống database ở thread nền)"""
+        self.usage_writer.record(keyword)
+    
+    def flush_usage(self) -> int:
+        """Ghi ngay các usage count đang chờ"""
+        return self.usage_writer.flush()
+    
+    def close(self):
+        """Flush usage count và đóng kết nối trước khi thoát ứng dụng"""
+        self.usage_writer.close()
+        self.close_connections()
+        with Database._shared_lock:
+            key = os.path.abspath(self.db_path)
+            if Database._instances.get(key) is self:
+                del Database._instances[key]
+    
     def get_snippet(self, keyword: str) -> Optional[str]:
         """Lấy content theo keyword và tăng usage count"""
+        # Index bộ nhớ luôn đồng bộ với database nên đọc từ đó trước
+        content = self.index.get(keyword) if self.index.loaded else None
+        if content is None:
+            result = self.get_connection().execute(
+                "SELECT content FROM snippets WHERE keyword = ?",
+                (keyword,)
+            ).fetchone()
+            content = result['content'] if result else None
+        
+        if content is not None:
+            # Usage count được ghi theo lô ở thread nền
+            self.record_usage(keyword)
+        return content
+    
+    # Cột của một snippet đầy đủ (cho cửa sổ quản lý)
+    RECORD_COLUMNS = '''
+        id, keyword, content, usage_count,
+        datetime(created_at, 'localtime') AS created_at,
+        datetime(last_used, 'localtime') AS last_used
+    '''
+    # Số tham số tối đa trong một câu IN (...) khi đọc theo lô
+    BATCH_SIZE = 500
+    
+    def get_snippet_record(self, keyword: Optional[str] = None,
+                           snippet_id: Optional[int] = None) -> Optional[sqlite3.Row]:
+        """Đọc đầy đủ một snippet theo keyword hoặc id (không tính là một lần dùng)"""
+        if keyword is None and snippet_id is None:
+            raise ValueError("Cần keyword hoặc snippet_id")
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        # Lấy content
-        cursor.execute(
-            "SELECT content FROM snippets WHERE keyword = ?",
-            (keyword,)
-        )
-        result = cursor.fetchone()
-        
-        if result:
-            # Tăng usage count và cập nhật last_used
-            cursor.execute('''
-                UPDATE snippets 
-                SET usage_count = usage_count + 1,
-                    last_used = CURRENT_TIMESTAMP
-                WHERE keyword = ?
-            ''', (keyword,))
-            conn.commit()
-            content = result['content']
-        else:
-            content = None
+        if keyword is not None:
+            return conn.execute(
+                f"SELECT {self.RECORD_COLUMNS} FROM snippets WHERE keyword = ?",
+                (keyword,)
+            ).fetchone()
+        return conn.execute(
+            f"SELECT {self.RECORD_COLUMNS} FROM snippets WHERE id = ?",
+            (snippet_id,)
+        ).fetchone()
+    
+    def get_snippet_records(self, keywords) -> dict:
+        """Đọc nhiều snippet một lúc, trả về {keyword: record} (bỏ qua keyword không có)"""
+        conn = self.get_connection()
+        keywords = list(dict.fromkeys(keywords))
+        records = {}
         
-        conn.close()
-        return content
+        for start in range(0, len(keywords), self.BATCH_SIZE):
+            batch = keywords[start:start + self.BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            for row in conn.execute(
+                f"SELECT {self.RECORD_COLUMNS} FROM snippets WHERE keyword IN ({placeholders})",
+                batch
+            ):
+                records[row['keyword']] = row
+        return records
     
     def update_snippet(self, keyword: str, content: str) -> bool:
         """Cập nhật snippet"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute(
-            "UPDATE snippets SET content = ? WHERE keyword = ?",
-            (content, keyword)
-        )
+        with conn:
+            cursor = conn.execute(
+                "UPDATE snippets SET content = ?, updated_at = CURRENT_TIMESTAMP WHERE keyword = ?",
+                (content, keyword)
+            )
         updated = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        if updated:
+            self.index.set(keyword, content)
         return updated
     
     def delete_snippet(self, keyword: str) -> bool:
         """Xóa snippet"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM snippets WHERE keyword = ?", (keyword,))
+        with conn:
+            cursor = conn.execute("DELETE FROM snippets WHERE keyword = ?", (keyword,))
         deleted = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        if deleted:
+            self.index.remove(keyword)
         return deleted
     
     def get_all_snippets(self) -> List[Tuple]:
         """Lấy tất cả snippets (cho hiển thị)"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
+        return conn.execute('''
             SELECT keyword, content, usage_count, 
                    datetime(last_used, 'localtime') as last_used
             FROM snippets 
             ORDER BY usage_count DESC, keyword
-        ''')
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        ''').fetchall()
     
-    def search_snippets(self, search_text: str) -> List[Tuple]:
-        """Tìm kiếm snippets (trong keyword và content)"""
+    IMPORT_POLICIES = ('skip', 'overwrite', 'rename')
+    IMPORT_BATCH_SIZE = 1000
+    
+    def import_snippets(self, records, policy: str = 'skip',
+                        progress: Optional[Callable[[int], None]] = None,
+                        cancelled: Optional[Callable[[], bool]] = None) -> dict:
+        """Import nhiều snippets trong một transaction
+        
+        records là iterable các dict (keyword, content và tùy chọn usage_count,
+        created_at, last_used), vd từ snippet_io.SnippetReader. Ghi theo lô bằng
+        executemany nên chỉ commit (và fsync) một lần. Keyword đã tồn tại:
+          - 'skip': giữ snippet cũ
+          - 'overwrite': thay content, giữ usage_count/last_used lớn hơn
+          - 'rename': thêm với keyword mới (keyword_2, keyword_3...)
+        
+        progress(số bản ghi đã xử lý) được gọi sau mỗi lô; cancelled() trả về
+        True thì rollback toàn bộ. Trả về số lượng added/updated/skipped/renamed
+        và cancelled.
+        """
+        if policy not in self.IMPORT_POLICIES:
+            raise ValueError(f"policy phải là một trong {self.IMPORT_POLICIES}")
+        
+        if policy == 'overwrite':
+            sql = '''
+                INSERT INTO snippets
+                    (keyword, keyword_folded, content, usage_count, created_at, last_used,
+                     updated_at)
+                VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(keyword) DO UPDATE SET
+                    content = excluded.content,
+                    updated_at = excluded.updated_at,
+                    usage_count = MAX(usage_count, excluded.usage_count),
+                    last_used = COALESCE(MAX(last_used, excluded.last_used),
+                                         last_used, excluded.last_used)
+            '''
+        else:
+            sql = '''
+                INSERT INTO snippets
+                    (keyword, keyword_folded, content, usage_count, created_at, last_used,
+                     updated_at)
+                VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(keyword) DO NOTHING
+            '''
+        
+        # Keyword đã có (trong database và đã gặp trong file) để đếm và đổi tên
+        existing = set(self.index.keywords())
+        counts = {'added': 0, 'updated': 0, 'skipped': 0, 'renamed': 0, 'cancelled': False}
+        processed = 0
+        batch = []
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        search_pattern = f"%{search_text}%"
-        cursor.execute('''
-            SELECT keyword, content, usage_count
-            FROM snippets 
-            WHERE keyword LIKE ? OR content LIKE ?
-            ORDER BY usage_count DESC
-        ''', (search_pattern, search_pattern))
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        def flush():
+            conn.executemany(sql, batch)
+            batch.clear()
+            if progress is not None:
+                progress(processed)
+            if cancelled is not None and cancelled():
+                raise InterruptedError
+        
+        try:
+            with conn:
+                for record in records:
+                    processed += 1
+                    keyword = record['keyword'].strip()
+                    content = record['content']
+                    if not keyword or not content:
+                        counts['skipped'] += 1
+                        continue
+                    
+                    if keyword in existing:
+                        if policy == 'skip':
+                            counts['skipped'] += 1
+                            continue
+                        if policy == 'rename':
+                            keyword = self._free_keyword(keyword, existing)
+                            counts['renamed'] += 1
+                        else:
+                            counts['updated'] += 1
+                    else:
+                        counts['added'] += 1
+                    existing.add(keyword)
+                    
+                    batch.append((
+                        keyword, remove_accents(keyword), content,
+                        record.get('usage_count') or 0,
+                        record.get('created_at'), record.get('last_used')
+                    ))
+                    if len(batch) >= self.IMPORT_BATCH_SIZE:
+                        flush()
+                if batch:
+                    flush()
+        except InterruptedError:
+            # `with conn` đã rollback
+            counts['cancelled'] = True
+            return counts
+        
+        if progress is not None:
+            progress(processed)
+        # Nhiều thay đổi cùng lúc: nạp lại index một lần (listener nhận 'load')
+        if counts['added'] or counts['updated'] or counts['renamed']:
+            self.reload_index()
+        return counts
+    
+    @staticmethod
+    def _free_keyword(keyword: str, existing: set) -> str:
+        """keyword_2, keyword_3... đầu tiên chưa có"""
+        number = 2
+        while f"{keyword}_{number}" in existing:
+            number += 1
+        return f"{keyword}_{number}"
+    
+    EXPORT_BATCH_SIZE = 500
+    
+    def iter_snippets(self, batch_size: Optional[int] = None, since: Optional[str] = None):
+        """Duyệt mọi snippet (đủ metadata, thời gian giữ nguyên UTC) bằng fetchmany
+        
+        Chỉ giữ một lô trong bộ nhớ, dùng cho export bảng lớn. since (UTC,
+        'YYYY-MM-DD HH:MM:SS') chỉ lấy snippet thay đổi từ thời điểm đó.
+        """
+        sql = '''
+            SELECT keyword, content, usage_count, created_at, last_used, updated_at
+            FROM snippets
+        '''
+        if since is None:
+            cursor = self.get_connection().execute(sql + " ORDER BY id")
+        else:
+            # Theo idx_updated_at: chỉ đọc các dòng đã đổi
+            cursor = self.get_connection().execute(
+                sql + " WHERE updated_at >= ? ORDER BY updated_at", (since,)
+            )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size or self.EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+    
+    def count_snippets(self) -> int:
+        """Tổng số snippets"""
+        return self.get_connection().execute("SELECT COUNT(*) FROM snippets").fetchone()[0]
+    
+    # Số ký tự đầu của content trả về làm preview
+    PREVIEW_LENGTH = 80
+    
+    def get_snippet_page(self, after: Optional[Tuple[int, str]] = None,
+                         limit: int = 200) -> List[Tuple]:
+        """Một trang snippets cho danh sách, không kèm toàn bộ content
+        
+        Sắp theo usage_count giảm dần rồi keyword (như get_all_snippets).
+        after = (usage_count, keyword) của dòng cuối trang trước: phân trang
+        theo khóa nên trang sau không phải đếm lại các dòng đã qua như OFFSET.
+        """
+        conn = self.get_connection()
+        
+        if after is None:
+            return conn.execute('''
+                SELECT keyword, substr(content, 1, ?) AS preview, usage_count,
+                       datetime(last_used, 'localtime') as last_used
+                FROM snippets
+                ORDER BY usage_count DESC, keyword
+                LIMIT ?
+            ''', (self.PREVIEW_LENGTH, limit)).fetchall()
+        
+        usage, keyword = after
+        return conn.execute('''
+            SELECT keyword, substr(content, 1, ?) AS preview, usage_count,
+                   datetime(last_used, 'localtime') as last_used
+            FROM snippets
+            WHERE usage_count <= ? AND (usage_count < ? OR keyword > ?)
+            ORDER BY usage_count DESC, keyword
+            LIMIT ?
+        ''', (self.PREVIEW_LENGTH, usage, usage, keyword, limit)).fetchall()
+    
+    # Trọng số bm25 của cột keyword so với content
+    FTS_KEYWORD_WEIGHT = 10.0
+    # Số biến thể d/đ tối đa cho một từ trong câu truy vấn
+    FTS_MAX_VARIANTS = 8
+    # Số lệnh VM của SQLite giữa hai lần kiểm tra hủy truy vấn
+    PROGRESS_STEPS = 1000
+    
+    @classmethod
+    def _fts_query(cls, search_text: str) -> Optional[str]:
+        """Chuyển text người dùng gõ thành câu truy vấn FTS5 (mỗi từ là một tiền tố)
+        
+        "đ" không bị tokenizer bỏ dấu nên mỗi "d" được mở rộng thành d/đ:
+        "dia chi" → ("dia"* OR "đia"*) AND "chi"*. Trả về None nếu không có từ nào.
+        """
+        terms = []
+        for word in re.findall(r'\w+', remove_accents(search_text).lower()):
+            variants = ['']
+            for ch in word:
+                options = ('d', 'đ') if ch == 'd' else (ch,)
+                variants = [v + o for v in variants for o in options]
+                if len(variants) > cls.FTS_MAX_VARIANTS:
+                    variants = [word]
+                    break
+            term = ' OR '.join(f'"{v}"*' for v in variants)
+            terms.append(f'({term})' if len(variants) > 1 else term)
+        return ' AND '.join(terms) if terms else None
+    
+    def search_snippets(self, search_text: str, limit: Optional[int] = None,
+                        markers: Tuple[str, str] = ('[', ']'),
+                        cancelled: Optional[Callable[[], bool]] = None) -> List[Tuple]:
+        """Tìm kiếm snippets (trong keyword và content)
+        
+        Dùng FTS5: xếp hạng theo bm25 kết hợp usage_count, kèm keyword_highlight
+        và content_snippet (đoạn nội dung khớp, bao bởi markers). Không có FTS5
+        hoặc text không có chữ/số nào thì quét bằng LIKE như cũ.
+        
+        cancelled() được SQLite gọi định kỳ trong lúc chạy truy vấn; trả về
+        True thì truy vấn dừng ngay và kết quả là danh sách rỗng.
+        """
+        conn = self.get_connection()
+        limit = -1 if limit is None else limit
+        if cancelled is not None:
+            conn.set_progress_handler(lambda: 1 if cancelled() else 0, self.PROGRESS_STEPS)
+        
+        try:
+            query = self._fts_query(search_text) if self.has_fts else None
+            if query is not None:
+                try:
+                    # bm25 càng âm càng khớp; snippet hay dùng được đẩy lên tối đa 2 lần
+                    return conn.execute('''
+                        SELECT s.keyword, s.content, s.usage_count,
+                               datetime(s.last_used, 'localtime') AS last_used,
+                               highlight(snippets_fts, 0, :open, :close) AS keyword_highlight,
+                               snippet(snippets_fts, 1, :open, :close, '…', 12) AS content_snippet
+                        FROM snippets_fts
+                        JOIN snippets s ON s.id = snippets_fts.rowid
+                        WHERE snippets_fts MATCH :query
+                        ORDER BY bm25(snippets_fts, :weight, 1.0)
+                                 * (1.0 + s.usage_count / (s.usage_count + 10.0))
+                        LIMIT :limit
+                    ''', {'query': query, 'open': markers[0], 'close': markers[1],
+                          'weight': self.FTS_KEYWORD_WEIGHT, 'limit': limit}).fetchall()
+                except sqlite3.OperationalError as e:
+                    if cancelled is not None and cancelled():
+                        return []
+                    print(f"⚠️ Lỗi FTS5, tìm bằng LIKE: {e}")
+            
+            search_pattern = f"%{search_text}%"
+            return conn.execute('''
+                SELECT keyword, content, usage_count,
+                       datetime(last_used, 'localtime') AS last_used,
+                       keyword AS keyword_highlight,
+                       substr(content, 1, 80) AS content_snippet
+                FROM snippets 
+                WHERE keyword LIKE ? OR content LIKE ?
+                ORDER BY usage_count DESC
+                LIMIT ?
+            ''', (search_pattern, search_pattern, limit)).fetchall()
+        except sqlite3.OperationalError:
+            if cancelled is not None and cancelled():
+                return []
+            raise
+        finally:
+            if cancelled is not None:
+                conn.set_progress_handler(None, 0)
     
     def get_most_used(self, limit=10):
         """Lấy snippets dùng nhiều nhất"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
+        return conn.execute('''
             SELECT keyword, content, usage_count
             FROM snippets 
             ORDER BY usage_count DESC 
             LIMIT ?
-        ''', (limit,))
-        results = cursor.fetchall()
-        conn.close()
-        return results
-    
-    def backup_database(self, backup_path: str):
-        """Sao lưu database"""
-        import shutil
-        shutil.copy2(self.db_path, backup_path)
-        print(f"Database backed up to: {backup_path}")
\ No newline at end of file
+        ''', (limit,)).fetchall()
+    
+    def get_typing_profiles(self) -> List[Tuple]:
+        """Lấy tốc độ gõ đã học của các ứng dụng"""
+        conn = self.get_connection()
+        
+        return conn.execute('''
+            SELECT app, key_delay, chunk_size, expansions, corrections, chars_per_sec
+            FROM typing_profiles
+            ORDER BY expansions DESC
+        ''').fetchall()
+    
+    def save_typing_profiles(self, profiles: List[Tuple]):
+        """Lưu (app, key_delay, chunk_size, expansions, corrections, chars_per_sec)"""
+        conn = self.get_connection()
+        
+        with conn:
+            conn.executemany('''
+                INSERT INTO typing_profiles
+                    (app, key_delay, chunk_size, expansions, corrections, chars_per_sec, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(app) DO UPDATE SET
+                    key_delay = excluded.key_delay,
+                    chunk_size = excluded.chunk_size,
+                    expansions = excluded.expansions,
+                    corrections = excluded.corrections,
+                    chars_per_sec = excluded.chars_per_sec,
+                    updated_at = excluded.updated_at
+            ''', profiles)
+    
+    # Số trang (thường 4KB) chép mỗi bước khi backup
+    BACKUP_PAGES = 256
+    
+    def backup_database(self, backup_path: str,
+                        progress: Optional[Callable[[int, int], None]] = None):
+        """Sao lưu database bằng backup API của SQLite
+        
+        Chép từng BACKUP_PAGES trang, nhả GIL trong mỗi bước nên keyboard
+        listener không bị chặn. Kết nối nguồn riêng giữ một read transaction
+        suốt quá trình: với WAL người ghi vẫn ghi bình thường, còn bản sao là
+        ảnh chụp nhất quán tại lúc bắt đầu (không bị chép lại từ đầu mỗi khi
+        database thay đổi). Ghi ra file tạm rồi mới đổi tên nên backup_path
+        không bao giờ là bản chép dở. progress(số trang còn lại, tổng số trang).
+        """
+        temp_path = backup_path + '.tmp'
+        source = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT)
+        target = sqlite3.connect(temp_path)
+        try:
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM snippets LIMIT 1").fetchone()
+            source.backup(
+                target, pages=self.BACKUP_PAGES,
+                progress=(lambda status, remaining, total: progress(remaining, total))
+                if progress is not None else None
+            )
+        except BaseException:
+            target.close()
+            os.remove(temp_path)
+            raise
+        finally:
+            source.close()
+        target.close()
+        os.replace(temp_path, backup_path)
+        print(f"Database backed up to: {backup_path}")
@@ -0,0 +1,383 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from pynput.keyboard import Key
+
+# Phím tắt dán theo hệ điều hành
+PASTE_MODIFIER = Key.cmd if sys.platform == 'darwin' else Key.ctrl
+
+
+# ========== CLIPBOARD ==========
+class Win32Clipboard:
+    """Đọc/ghi clipboard dạng Unicode qua Win32 API (ctypes)"""
+
+    CF_UNICODETEXT = 13
+    GMEM_MOVEABLE = 0x0002
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self.user32 = ctypes.WinDLL('user32', use_last_error=True)
+        self.kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+
+        self.user32.OpenClipboard.argtypes = [wintypes.HWND]
+        self.user32.OpenClipboard.restype = wintypes.BOOL
+        self.user32.GetClipboardData.argtypes = [wintypes.UINT]
+        self.user32.GetClipboardData.restype = wintypes.HANDLE
+        self.user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+        self.user32.SetClipboardData.restype = wintypes.HANDLE
+        self.user32.IsClipboardFormatAvailable.argtypes = [wintypes.UINT]
+        self.kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+        self.kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+        self.kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+        self.kernel32.GlobalLock.restype = wintypes.LPVOID
+        self.kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+        self.kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
+        self.kernel32.GlobalFree.restype = wintypes.HGLOBAL
+
+    def _open(self) -> bool:
+        # Ứng dụng khác có thể đang giữ clipboard, thử lại vài lần
+        for _ in range(10):
+            if self.user32.OpenClipboard(None):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def can_restore(self) -> bool:
+        """Chỉ khôi phục được nếu clipboard rỗng hoặc đang chứa text"""
+        return (self.user32.CountClipboardFormats() == 0 or
+                bool(self.user32.IsClipboardFormatAvailable(self.CF_UNICODETEXT)))
+
+    def get(self) -> Optional[str]:
+        """Text trong clipboard, None nếu clipboard rỗng (OSError nếu không đọc được)"""
+        if not self._open():
+            raise OSError("Không mở được clipboard")
+        try:
+            handle = self.user32.GetClipboardData(self.CF_UNICODETEXT)
+            if not handle:
+                if self.user32.CountClipboardFormats() == 0:
+                    return None
+                raise OSError("Clipboard không chứa text")
+            pointer = self.kernel32.GlobalLock(handle)
+            try:
+                return self._ctypes.wstring_at(pointer)
+            finally:
+                self.kernel32.GlobalUnlock(handle)
+        finally:
+            self.user32.CloseClipboard()
+
+    def set(self, text: str):
+        buffer = self._ctypes.create_unicode_buffer(text)
+        size = self._ctypes.sizeof(buffer)
+        handle = self.kernel32.GlobalAlloc(self.GMEM_MOVEABLE, size)
+        if not handle:
+            raise OSError("Không cấp phát được bộ nhớ cho clipboard")
+        pointer = self.kernel32.GlobalLock(handle)
+        self._ctypes.memmove(pointer, buffer, size)
+        self.kernel32.GlobalUnlock(handle)
+
+        # Chỉ khi SetClipboardData thành công thì hệ thống mới giữ handle;
+        # các trường hợp còn lại phải tự giải phóng
+        if not self._open():
+            self.kernel32.GlobalFree(handle)
+            raise OSError("Không mở được clipboard")
+        try:
+            self.user32.EmptyClipboard()
+            if not self.user32.SetClipboardData(self.CF_UNICODETEXT, handle):
+                self.kernel32.GlobalFree(handle)
+                raise OSError("Không ghi được clipboard")
+        finally:
+            self.user32.CloseClipboard()
+
+    def clear(self):
+        if not self._open():
+            raise OSError("Không mở được clipboard")
+        try:
+            self.user32.EmptyClipboard()
+        finally:
+            self.user32.CloseClipboard()
+
+
+def _split_lines(output: str) -> List[str]:
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+def _mac_clipboard_types(output: str) -> List[str]:
+    """Kiểu dữ liệu từ `clipboard info` của AppleScript ("«class utf8», 5, string, 5")"""
+    parts = [part.strip() for part in output.strip().split(',')]
+    return [part for part in parts[::2] if part]
+
+
+class CommandClipboard:
+    """Clipboard qua công cụ dòng lệnh (pbcopy/pbpaste, xclip, wl-copy)
+
+    types_cmd liệt kê các kiểu dữ liệu clipboard đang giữ; chỉ khôi phục được
+    nếu clipboard rỗng hoặc chỉ chứa text thuần (ảnh, file, HTML... sẽ mất).
+    """
+
+    # Các kiểu text thuần của X11/Wayland và macOS
+    TEXT_TYPES = {
+        'text/plain', 'text/plain;charset=utf-8', 'UTF8_STRING', 'STRING', 'TEXT',
+        'COMPOUND_TEXT', '«class utf8»', '«class ut16»', 'string', 'Unicode text',
+    }
+    # Kiểu phụ của giao thức X11, không phải nội dung
+    META_TYPES = {'TARGETS', 'TIMESTAMP', 'MULTIPLE', 'SAVE_TARGETS', 'DELETE'}
+
+    def __init__(self, get_cmd, set_cmd, types_cmd, clear_cmd=None,
+                 empty_errors=(), parse_types=_split_lines):
+        self.get_cmd = get_cmd
+        self.set_cmd = set_cmd
+        self.types_cmd = types_cmd
+        self.clear_cmd = clear_cmd
+        # Thông báo lỗi của types_cmd khi clipboard rỗng
+        self.empty_errors = empty_errors
+        self.parse_types = parse_types
+
+    def types(self) -> List[str]:
+        """Các kiểu dữ liệu clipboard đang giữ ([] nếu rỗng)"""
+        result = subprocess.run(self.types_cmd, capture_output=True, timeout=1)
+        if result.returncode != 0:
+            error = result.stderr.decode('utf-8', errors='replace').strip()
+            if any(message in error for message in self.empty_errors):
+                return []
+            raise OSError(f"Không đọc được clipboard: {error}")
+        return [kind for kind in self.parse_types(result.stdout.decode('utf-8', errors='replace'))
+                if kind not in self.META_TYPES]
+
+    def can_restore(self) -> bool:
+        return all(kind in self.TEXT_TYPES for kind in self.types())
+
+    def get(self) -> Optional[str]:
+        """Text trong clipboard, None nếu clipboard rỗng (OSError nếu không đọc được)"""
+        if not self.types():
+            return None
+        result = subprocess.run(self.get_cmd, capture_output=True, timeout=1)
+        if result.returncode != 0:
+            raise OSError("Không đọc được clipboard")
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def set(self, text: str):
+        subprocess.run(self.set_cmd, input=text.encode('utf-8'), timeout=1, check=True)
+
+    def clear(self):
+        """Xóa clipboard (công cụ không có lệnh xóa thì ghi chuỗi rỗng)"""
+        if self.clear_cmd:
+            subprocess.run(self.clear_cmd, timeout=1, check=True)
+        else:
+            self.set('')
+
+
+def create_clipboard():
+    """Tạo clipboard phù hợp với hệ điều hành (None nếu không hỗ trợ)"""
+    try:
+        if sys.platform == 'win32':
+            return Win32Clipboard()
+        if sys.platform == 'darwin':
+            return CommandClipboard(['pbpaste'], ['pbcopy'],
+                                    ['osascript', '-e', 'clipboard info'],
+                                    parse_types=_mac_clipboard_types)
+        if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-copy'):
+            return CommandClipboard(['wl-paste', '--no-newline'], ['wl-copy'],
+                                    ['wl-paste', '--list-types'], ['wl-copy', '--clear'],
+                                    empty_errors=('Nothing is copied', 'No selection'))
+        if shutil.which('xclip'):
+            return CommandClipboard(['xclip', '-selection', 'clipboard', '-o'],
+                                    ['xclip', '-selection', 'clipboard'],
+                                    ['xclip', '-selection', 'clipboard', '-t', 'TARGETS', '-o'],
+                                    empty_errors=('not available',))
+    except (OSError, AttributeError):
+        pass
+    return None
+
+
+# ========== ỨNG DỤNG ĐANG ACTIVE ==========
+def foreground_app() -> str:
+    """Tên file thực thi (chữ thường) của cửa sổ đang active, '' nếu không xác định được"""
+    if sys.platform != 'win32':
+        return ''
+    try:
+        import ctypes
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+
+        hwnd = user32.GetForegroundWindow()
+        if not hwnd:
+            return ''
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        process = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid.value)
+        if not process:
+            return ''
+        try:
+            size = wintypes.DWORD(260)
+            path = ctypes.create_unicode_buffer(size.value)
+            if not kernel32.QueryFullProcessImageNameW(process, 0, path, ctypes.byref(size)):
+                return ''
+            return os.path.basename(path.value).lower()
+        finally:
+            kernel32.CloseHandle(process)
+    except (OSError, AttributeError):
+        return ''
+
+
+# ========== BACKEND GÕ TEXT ==========
+class KeyPressInjector:
+    """Nhấn/thả từng phím có nghỉ giữa các phím (chậm nhưng tương thích nhất)"""
+
+    name = 'keys'
+
+    def __init__(self, controller, key_delay=0.002, backspace_delay=0.001):
+        self.controller = controller
+        self.key_delay = key_delay
+        self.backspace_delay = backspace_delay
+
+    def delete(self, count: int):
+        for _ in range(count):
+            self.controller.press(Key.backspace)
+            self.controller.release(Key.backspace)
+            if self.backspace_delay > 0:
+                time.sleep(self.backspace_delay)
+
+    def type(self, text: str):
+        if self.key_delay <= 0:
+            # Ứng dụng đủ nhanh: gõ liền không nghỉ
+            self.controller.type(text)
+            return
+        for ch in text:
+            self.controller.press(ch)
+            self.controller.release(ch)
+            time.sleep(self.key_delay)
+
+
+class ChunkedTypeInjector:
+    """Gõ theo từng khối bằng Controller.type, chỉ nghỉ giữa các khối"""
+
+    name = 'chunked'
+
+    def __init__(self, controller, chunk_size=32, chunk_delay=0.005):
+        self.controller = controller
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+
+    def delete(self, count: int):
+        for _ in range(count):
+            self.controller.press(Key.backspace)
+            self.controller.release(Key.backspace)
+
+    def type(self, text: str):
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            self.controller.type(text[start:start + self.chunk_size])
+
+
+class ClipboardPasteInjector(ChunkedTypeInjector):
+    """Dán nội dung qua clipboard rồi khôi phục clipboard cũ"""
+
+    name = 'clipboard'
+
+    def __init__(self, controller, clipboard, restore_delay=0.2):
+        super().__init__(controller)
+        self.clipboard = clipboard
+        # Thời gian chờ ứng dụng đích đọc clipboard trước khi khôi phục
+        self.restore_delay = restore_delay
+
+    @property
+    def available(self) -> bool:
+        if self.clipboard is None:
+            return False
+        try:
+            return self.clipboard.can_restore()
+        except (OSError, subprocess.SubprocessError):
+            return False
+
+    def type(self, text: str):
+        try:
+            saved = self.clipboard.get()
+            self.clipboard.set(text)
+        except (OSError, subprocess.SubprocessError):
+            # Không dùng được clipboard lúc này: gõ theo khối
+            super().type(text)
+            return
+        try:
+            with self.controller.pressed(PASTE_MODIFIER):
+                self.controller.press('v')
+                self.controller.release('v')
+            time.sleep(self.restore_delay)
+        finally:
+            # get() trả về None chỉ khi clipboard thực sự rỗng (không đọc được
+            # thì đã gõ theo khối ở trên): xóa đi, không để lại nội dung vừa dán
+            if saved is not None:
+                self.clipboard.set(saved)
+            else:
+                self.clipboard.clear()
+
+
+class Injector:
+    """Chọn backend gõ text theo độ dài nội dung và ứng dụng đích"""
+
+    # Nội dung ngắn: gõ từng phím như cũ
+    KEYS_MAX_LENGTH = 64
+    # Nội dung trung bình: gõ theo khối; dài hơn thì dán qua clipboard
+    CHUNKED_MAX_LENGTH = 400
+
+    # Backend cố định cho các ứng dụng không hợp với cách chọn mặc định
+    # (terminal không dán bằng Ctrl+V, trình quản lý mật khẩu chặn clipboard...)
+    APP_RULES = {
+        'cmd.exe': 'chunked',
+        'conhost.exe': 'chunked',
+        'powershell.exe': 'chunked',
+        'windowsterminal.exe': 'chunked',
+        'mintty.exe': 'chunked',
+        'putty.exe': 'keys',
+        'keepass.exe': 'keys',
+        'keepassxc.exe': 'keys',
+    }
+
+    def __init__(self, controller, clipboard=None):
+        self.keys = KeyPressInjector(controller)
+        self.chunked = ChunkedTypeInjector(controller)
+        self.clipboard = ClipboardPasteInjector(
+            controller, clipboard if clipboard is not None else create_clipboard()
+        )
+        self.backends = {
+            backend.name: backend
+            for backend in (self.keys, self.chunked, self.clipboard)
+        }
+
+    def apply_profile(self, profile):
+        """Áp dụng tốc độ gõ đã học (xem pacing.TypingProfile)"""
+        self.keys.key_delay = profile.key_delay
+        self.keys.backspace_delay = profile.key_delay / 2
+        self.chunked.chunk_size = profile.chunk_size
+        self.clipboard.chunk_size = profile.chunk_size
+
+    def select(self, content: str, app: Optional[str] = None, profile=None):
+        """Chọn backend cho nội dung sắp gõ vào ứng dụng app"""
+        if app is None:
+            app = foreground_app()
+        if profile is not None:
+            self.apply_profile(profile)
+        rule = self.APP_RULES.get(app)
+        if rule:
+            backend = self.backends[rule]
+            if backend is not self.clipboard or self.clipboard.available:
+                return backend
+
+        # Nội dung nhiều dòng: dán để Enter không gửi tin nhắn giữa chừng
+        multiline = '\n' in content
+        if len(content) > self.CHUNKED_MAX_LENGTH or multiline:
+            if self.clipboard.available:
+                return self.clipboard
+        if len(content) <= self.KEYS_MAX_LENGTH:
+            return self.keys
+        return self.chunked
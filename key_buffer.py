@@ -0,0 +1,146 @@
+from typing import Optional
+
+from matcher import KeywordMatcher
+
+
+class KeyBuffer:
+    """Buffer vòng kích thước cố định chứa các ký tự vừa gõ
+
+    Ký tự và state của matcher được lưu trong hai mảng cấp phát sẵn, nên
+    thêm/xóa ký tự ở cuối là O(1) và không tạo object mới. Vị trí con trỏ
+    được theo dõi để phím mũi tên trái/phải không làm mất buffer; state chỉ
+    được tính cho phần đứng trước con trỏ, lúc cần tới.
+
+    Chỉ worker thread ghi vào buffer nên không cần khóa. Các state được tính
+    trên một Automaton cố định (`automaton`); khi matcher publish bản mới,
+    lần tính tiếp theo chuyển sang bản đó và tính lại từ đầu.
+    """
+
+    __slots__ = ('capacity', 'matcher', '_chars', '_states', '_start',
+                 '_length', '_cursor', '_valid', '_automaton')
+
+    def __init__(self, matcher: KeywordMatcher, capacity: int = 50):
+        self.capacity = capacity
+        self.matcher = matcher
+        self._chars = [''] * capacity
+        self._states = [KeywordMatcher.ROOT] * capacity  # state sau mỗi ký tự
+        self._start = 0      # vị trí vật lý của ký tự đầu tiên
+        self._length = 0
+        self._cursor = 0     # số ký tự đứng trước con trỏ
+        self._valid = 0      # số ký tự đầu tiên đã có state đúng
+        self._automaton = matcher.automaton
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def automaton(self):
+        """Automaton ứng với các state mà buffer trả về"""
+        return self._automaton
+
+    @property
+    def cursor(self) -> int:
+        return self._cursor
+
+    def _slot(self, index: int) -> int:
+        return (self._start + index) % self.capacity
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+        self._cursor = 0
+        self._valid = 0
+
+    def append(self, ch: str):
+        """Thêm ký tự tại con trỏ (thường là cuối buffer)"""
+        if self._length == self.capacity:
+            if self._cursor:
+                # Đầy: bỏ ký tự cũ nhất; state còn lại được clamp khi dùng tới
+                self._start = (self._start + 1) % self.capacity
+                self._cursor -= 1
+                if self._valid:
+                    self._valid -= 1
+            # Con trỏ ở đầu buffer: bỏ ký tự cuối cùng thay vì ký tự đầu
+            self._length -= 1
+
+        cursor = self._cursor
+        if cursor < self._length:
+            # Chèn giữa buffer: dời phần sau con trỏ sang phải
+            chars = self._chars
+            for i in range(self._length, cursor, -1):
+                chars[self._slot(i)] = chars[self._slot(i - 1)]
+            self._valid = min(self._valid, cursor)
+        self._chars[self._slot(cursor)] = ch
+        self._length += 1
+        self._cursor = cursor + 1
+        self._advance()
+
+    def backspace(self) -> Optional[str]:
+        """Xóa ký tự trước con trỏ, trả về ký tự đã xóa"""
+        cursor = self._cursor
+        if cursor == 0:
+            return None
+        chars = self._chars
+        removed = chars[self._slot(cursor - 1)]
+        for i in range(cursor, self._length):
+            chars[self._slot(i - 1)] = chars[self._slot(i)]
+        self._length -= 1
+        self._cursor = cursor - 1
+        self._valid = min(self._valid, cursor - 1)
+        return removed
+
+    def delete(self) -> Optional[str]:
+        """Xóa ký tự sau con trỏ (phím Delete)"""
+        cursor = self._cursor
+        if cursor == self._length:
+            return None
+        chars = self._chars
+        removed = chars[self._slot(cursor)]
+        for i in range(cursor + 1, self._length):
+            chars[self._slot(i - 1)] = chars[self._slot(i)]
+        self._length -= 1
+        self._valid = min(self._valid, cursor)
+        return removed
+
+    def move(self, offset: int) -> bool:
+        """Di chuyển con trỏ; False nếu ra ngoài phần buffer đang theo dõi"""
+        cursor = self._cursor + offset
+        if cursor < 0 or cursor > self._length:
+            return False
+        self._cursor = cursor
+        return True
+
+    def _advance(self):
+        """Tính state cho các ký tự trước con trỏ chưa có state"""
+        automaton = self.matcher.automaton
+        if automaton is not self._automaton:
+            self._automaton = automaton
+            self._valid = 0
+        states = self._states
+        chars = self._chars
+        while self._valid < self._cursor:
+            index = self._valid
+            if index:
+                previous = automaton.clamp(states[self._slot(index - 1)], index)
+            else:
+                previous = KeywordMatcher.ROOT
+            slot = self._slot(index)
+            states[slot] = automaton.step(previous, chars[slot])
+            self._valid = index + 1
+
+    def state(self) -> int:
+        """State của matcher ứng với phần trước con trỏ"""
+        self._advance()
+        if not self._cursor:
+            return KeywordMatcher.ROOT
+        return self._automaton.clamp(self._states[self._slot(self._cursor - 1)], self._cursor)
+
+    def text(self) -> str:
+        """Toàn bộ nội dung buffer"""
+        return ''.join(self._chars[self._slot(i)] for i in range(self._length))
+
+    def before_cursor(self, count: Optional[int] = None) -> str:
+        """count ký tự cuối cùng đứng trước con trỏ (mặc định: tất cả)"""
+        cursor = self._cursor
+        start = 0 if count is None else max(0, cursor - count)
+        return ''.join(self._chars[self._slot(i)] for i in range(start, cursor))
@@ -1,129 +1,271 @@
 import time
 import threading
 import logging
+import queue
+from collections import deque
 from pynput import keyboard
 from pynput.keyboard import Controller, Key, KeyCode
 from database import Database
+from injection import Injector, foreground_app
+from pacing import AdaptivePacer
+from matcher import KeywordMatcher, MatcherUpdater
+from key_buffer import KeyBuffer
+from composition import CompositionTracker
+from vietnamese import remove_accents
+from logging_setup import setup_logging
+from metrics import metrics
+
+MODIFIER_KEYS = {
+    Key.ctrl, Key.ctrl_l, Key.ctrl_r,
+    Key.alt, Key.alt_l, Key.alt_r,
+    Key.shift, Key.shift_l, Key.shift_r,
+}
+
+
+class EchoController(Controller):
+    """Controller ghi lại các phím đã gõ ra
+    
+    Listener cũng bắt được phím do chính chương trình gõ; worker dùng danh
+    sách này để bỏ qua chúng mà vẫn giữ phím thật người dùng gõ xen vào.
+    """
+    CONTROL_KEYS = {'\n': Key.enter, '\r': Key.enter, '\t': Key.tab}
+    
+    def __init__(self):
+        super().__init__()
+        self.echoes = deque()
+        # Thời điểm phím đầu tiên được gõ ra (đặt lại về None trước mỗi lần thay thế)
+        self.first_press_at = None
+    
+    def press(self, key):
+        if self.first_press_at is None:
+            self.first_press_at = time.perf_counter()
+        if key not in MODIFIER_KEYS:
+            self.echoes.append(self.CONTROL_KEYS.get(key, key) if isinstance(key, str) else key)
+        super().press(key)
+
 
 class TextExpander:
-    def __init__(self, db_path="snippets.db"):
-        # THIẾT LẬP LOGGING
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s [%(levelname)s] %(message)s',
-            filename='text_expander.log',
-            filemode='w'
-        )
+    # Số phím tiếp theo trong danh sách echo được xét khi so khớp (bỏ qua echo bị mất)
+    ECHO_LOOKAHEAD = 8
+    # Phím đến muộn hơn khoảng này sau khi gõ xong thì không còn là echo
+    ECHO_GRACE = 0.5
+    
+
+    def __init__(self, db_path=None, db=None):
+        # THIẾT LẬP LOGGING (ghi qua queue ở thread nền, xem logging_setup)
+        setup_logging()
         self.logger = logging.getLogger(__name__)
         
-        # Cũng in ra console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        self.logger.addHandler(console_handler)
+        # Dùng chung database của process (tray, cửa sổ quản lý)
+        self.db = db or Database.shared(db_path)
         
-        self.db = Database(db_path)
-        self.buffer = ""
+        # Automaton trên các keyword (so khớp theo dạng bỏ dấu), chạy từng
+        # phím một để lúc trigger chỉ cần đọc state hiện tại
+        self.matcher = KeywordMatcher(
+            self.db.index.keywords(),
+            normalize=remove_accents
+        )
+        # Thêm/xóa snippet (có thể từ thread giao diện) được áp dụng vào
+        # matcher ở thread nền
+        self.matcher_updater = MatcherUpdater(
+            self.matcher, self.db.index.keywords, self.db.index.__contains__
+        )
+        self.db.index.subscribe(self.on_index_changed)
+        
+        self.max_buffer_length = 50
+        # Buffer vòng giữ ký tự vừa gõ cùng state của matcher
+        self.buffer = KeyBuffer(self.matcher, self.max_buffer_length)
+        # Nhận biết các lần bộ gõ tiếng Việt sửa chữ (thay cho debounce cũ)
+        self.composition = CompositionTracker(self.buffer)
         self.is_enabled = True
         self.trigger_keys = {Key.space, Key.tab, Key.enter}
+        # Phím di chuyển con trỏ trong từ đang gõ
+        self.cursor_keys = {Key.left: -1, Key.right: 1}
         
-        self.max_buffer_length = 50
-        self.controller = Controller()
-        self.is_expanding = False
+        self.controller = EchoController()
+        # Chọn cách gõ (từng phím / theo khối / dán clipboard) theo nội dung
+        self.injector = Injector(self.controller)
+        # Tốc độ gõ học theo từng ứng dụng, lưu trong database
+        self.pacer = AdaptivePacer(self.db)
         self.modifiers = set()
-        self.buffer_lock = threading.Lock()
         
-        # THÊM: Theo dõi lần nhấn phím cuối để xử lý tiếng Việt
-        self.last_key_time = time.time()
-        self.key_debounce_time = 0.1  # 100ms
+        # Callback của pynput chỉ đẩy sự kiện vào hàng đợi; worker thread
+        # xử lý buffer, tìm kiếm và gõ thay thế theo đúng thứ tự
+        self.events = queue.SimpleQueue()
+        self.worker = None
+        self.injection_ended = 0.0
         
         self.logger.info("Text Expander initialized")
     
+    def on_index_changed(self, event: str, keyword):
+        """Cập nhật matcher khi snippets được thêm/xóa (không chờ dựng automaton)"""
+        if event in ('add', 'remove'):
+            self.matcher_updater.changed(keyword)
+        elif event == 'load':
+            self.matcher_updater.reload()
+    
     def clear_buffer(self):
         """Xóa buffer và log"""
-        with self.buffer_lock:
-            if self.buffer:
-                self.logger.debug(f"🔄 Clearing buffer: '{self.buffer}'")
-                self.buffer = ""
+        if len(self.buffer):
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("🔄 Clearing buffer: '%s'", self.buffer.text())
+            self.buffer.clear()
+        self.composition.reset()
     
-    def add_to_buffer(self, char: str):
+    def add_to_buffer(self, char: str, at: float = None):
         """Thêm ký tự vào buffer với xử lý tiếng Việt"""
-        current_time = time.time()
-        
-        # Xử lý debounce cho tiếng Việt
-        if current_time - self.last_key_time < self.key_debounce_time:
-            self.logger.debug(f"⚠️ Debounce: Ignoring fast key '{char}'")
-            return
-        
-        self.last_key_time = current_time
-        
-        with self.buffer_lock:
-            # KHÔNG bỏ qua space nữa - để xử lý riêng
-            if len(self.buffer) >= self.max_buffer_length:
-                removed = self.buffer[0]
-                self.buffer = self.buffer[1:]
-                self.logger.debug(f"Buffer full, removed '{removed}'")
-            
-            self.buffer += char
-            self.logger.debug(f"➕ Added '{char}' → Buffer: '{self.buffer}'")
+        # Không bỏ phím nào: loạt sửa của bộ gõ được nhận biết qua thời điểm phím
+        self.composition.on_char(char, time.perf_counter() if at is None else at)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("➕ Added '%s' → Buffer: '%s'", char, self.buffer.text())
     
-    def remove_from_buffer(self, count=1):
+    def remove_from_buffer(self, count=1, at: float = None):
         """Xóa ký tự khỏi buffer"""
-        with self.buffer_lock:
-            if self.buffer:
-                for _ in range(count):
-                    if self.buffer:
-                        removed = self.buffer[-1]
-                        self.buffer = self.buffer[:-1]
-                        self.logger.debug(f"➖ Removed '{removed}' → Buffer: '{self.buffer}'")
+        if at is None:
+            at = time.perf_counter()
+        for _ in range(count):
+            if not self.buffer.cursor:
+                break
+            self.composition.on_backspace(at)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("➖ Removed → Buffer: '%s'", self.buffer.text())
+    
+    def move_cursor(self, offset: int):
+        """Di chuyển con trỏ trong buffer; ra ngoài phần đã theo dõi thì xóa buffer"""
+        self.composition.finish()
+        if not self.buffer.move(offset):
+            self.clear_buffer()
+        else:
+            self.composition.resync()
     
     def get_current_buffer(self):
-        """Lấy buffer hiện tại"""
-        with self.buffer_lock:
-            return self.buffer
+        """Lấy phần buffer đứng trước con trỏ"""
+        return self.buffer.before_cursor()
+    
+    def get_buffer_state(self, text: str) -> int:
+        """State của matcher ứng với text (dùng state đã tính nếu text là buffer)
+        
+        State thuộc về self.buffer.automaton, để find_match đọc trên cùng một
+        phiên bản dù matcher vừa được dựng lại ở thread khác.
+        """
+        if text == self.buffer.before_cursor():
+            return self.buffer.state()
+        return self.buffer.automaton.feed(text)
     
     def on_press(self, key):
-        """Xử lý khi phím được nhấn"""
-        if self.is_expanding:
-            self.logger.debug("⏸️ Ignored (is_expanding)")
-            return
+        """Callback của listener: chỉ đưa phím vào hàng đợi rồi trả về ngay"""
+        self.events.put((True, key, time.perf_counter()))
+    
+    def on_release(self, key):
+        """Callback của listener khi phím được thả"""
+        self.events.put((False, key, time.perf_counter()))
+    
+    def process_events(self):
+        """Vòng lặp của worker thread"""
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            is_press, key, received_at = event
+            try:
+                if is_press:
+                    if self.is_echo(key, received_at):
+                        continue
+                    started = time.perf_counter()
+                    self.handle_press(key, received_at)
+                    metrics.record('key_queue', started - received_at)
+                    metrics.record('key_handling', time.perf_counter() - started)
+                    metrics.incr('keys')
+                else:
+                    self.handle_release(key)
+            except Exception as e:
+                if is_press:
+                    metrics.incr('dropped_keys')
+                self.logger.error("❌ ERROR while handling %s: %s", key, e)
+    
+    def is_echo(self, key, received_at: float) -> bool:
+        """Phím này có phải do chính chương trình gõ ra không"""
+        echoes = self.controller.echoes
+        if not echoes or key in MODIFIER_KEYS:
+            return False
+        if received_at > self.injection_ended + self.ECHO_GRACE:
+            # Listener không bắt được phím giả lập (hoặc đã bắt hết): bỏ danh sách cũ
+            echoes.clear()
+            return False
         
+        char = getattr(key, 'char', None)
+        for i in range(min(len(echoes), self.ECHO_LOOKAHEAD)):
+            expected = echoes[i]
+            if expected == key or (char is not None and self.same_char(expected, char)):
+                for _ in range(i + 1):
+                    echoes.popleft()
+                return True
+        return False
+    
+    @staticmethod
+    def same_char(expected, char: str) -> bool:
+        """So khớp ký tự, kể cả dạng control char khi đang giữ Ctrl (Ctrl+V → '\\x16')"""
+        if not isinstance(expected, str):
+            return False
+        return char == expected or (
+            len(expected) == 1 and expected.isalpha() and char == chr(ord(expected) & 0x1f)
+        )
+    
+    def handle_press(self, key, received_at: float = None):
+        """Xử lý khi phím được nhấn (chạy trên worker thread)"""
+        if received_at is None:
+            received_at = time.perf_counter()
         if not self.is_enabled:
             self.logger.debug("⏸️ Ignored (disabled)")
             return
         
         # Xử lý modifier keys
-        if key in [Key.ctrl, Key.ctrl_l, Key.ctrl_r, 
-                   Key.alt, Key.alt_l, Key.alt_r,
-                   Key.shift, Key.shift_l, Key.shift_r]:
+        if key in MODIFIER_KEYS:
             self.modifiers.add(key)
-            self.logger.debug(f"🔧 Modifier: {key}")
+            self.logger.debug("🔧 Modifier: %s", key)
             return
         
-        try:
-            # Phím ký tự
-            if hasattr(key, 'char') and key.char:
-                # KHÔNG kiểm tra modifier nữa để hỗ trợ Shift+char
-                self.add_to_buffer(key.char)
-                    
-        except AttributeError:
-            # Phím đặc biệt
+        # Ctrl+Z ngay sau khi thay thế → ứng dụng có thể đã rơi ký tự
+        self.pacer.observe_key(key, self.modifiers)
+        
+        # Phím ký tự
+        if getattr(key, 'char', None):
+            # KHÔNG kiểm tra modifier nữa để hỗ trợ Shift+char
+            self.add_to_buffer(key.char, received_at)
+        else:
+            # Phím đặc biệt (Key là Enum nên không có thuộc tính char)
             if key == Key.backspace:
-                current_buffer = self.get_current_buffer()
-                self.logger.debug(f"⌫ Backspace on buffer: '{current_buffer}'")
-                self.remove_from_buffer()
+                # Buffer đã xóa sau lần thay thế: backspace của người dùng khi
+                # buffer trống là đang xóa vào chữ vừa chèn
+                if not self.buffer.cursor and not self.composition.is_ime_backspace(received_at):
+                    self.pacer.observe_backspace()
+                self.remove_from_buffer(at=received_at)
+            
+            # Mũi tên trái/phải: theo dõi vị trí con trỏ thay vì xóa buffer
+            # (Ctrl+mũi tên nhảy cả từ nên vẫn xóa)
+            elif key in self.cursor_keys and not self.has_ctrl():
+                self.move_cursor(self.cursor_keys[key])
+                self.logger.debug("↔️ Cursor %d/%d", self.buffer.cursor, len(self.buffer))
+            
+            elif key == Key.delete:
+                self.composition.finish()
+                self.buffer.delete()
+                self.composition.resync()
             
             # Kiểm tra trigger key (space, tab, enter)
             elif key in self.trigger_keys:
+                # Áp dụng nốt loạt sửa của bộ gõ trước khi đọc buffer
+                self.composition.finish()
                 current_buffer = self.get_current_buffer()
-                self.logger.info(f"🎯 TRIGGER: {key} | Buffer: '{current_buffer}'")
+                self.logger.debug("🎯 TRIGGER: %s | Buffer: '%s'", key, current_buffer)
                 
                 if current_buffer:
                     # QUAN TRỌNG: Xóa space khỏi buffer nếu có
                     if current_buffer.endswith(' '):
                         current_buffer = current_buffer.rstrip()
-                        self.logger.debug(f"Trimmed space from buffer")
+                        self.logger.debug("Trimmed space from buffer")
                     
-                    self.process_buffer(current_buffer)
+                    self.process_buffer(current_buffer, received_at)
                 else:
                     self.logger.debug("Empty buffer on trigger")
                 
@@ -137,125 +279,129 @@ class TextExpander:
                     self.toggle_enabled()
             else:
                 # Các phím đặc biệt khác - XÓA BUFFER
-                self.logger.debug(f"🗑️ Special key, clearing buffer: {key}")
+                self.logger.debug("🗑️ Special key, clearing buffer: %s", key)
                 self.clear_buffer()
     
-    def on_release(self, key):
+    def has_ctrl(self) -> bool:
+        return bool(self.modifiers & {Key.ctrl, Key.ctrl_l, Key.ctrl_r})
+    
+    def handle_release(self, key):
         """Xử lý khi phím được thả"""
         # Xóa modifier key
-        if key in [Key.ctrl, Key.ctrl_l, Key.ctrl_r, 
-                   Key.alt, Key.alt_l, Key.alt_r,
-                   Key.shift, Key.shift_l, Key.shift_r]:
+        if key in MODIFIER_KEYS:
             if key in self.modifiers:
                 self.modifiers.remove(key)
-                self.logger.debug(f"🔧 Modifier released: {key}")
+                self.logger.debug("🔧 Modifier released: %s", key)
     
-    def process_buffer(self, buffer_text: str):
+    def process_buffer(self, buffer_text: str, triggered_at: float = None):
         """Xử lý buffer để tìm và thay thế snippet"""
+        if triggered_at is None:
+            triggered_at = time.perf_counter()
         # Loại bỏ khoảng trắng thừa
         keyword = buffer_text.strip()
+        self.logger.debug("🔍 Processing: '%s'", keyword)
         
-        # QUAN TRỌNG: Xử lý tiếng Việt - loại bỏ dấu
-        keyword_clean = self.remove_vietnamese_accents(keyword)
-        self.logger.info(f"🔍 Processing: '{keyword}' → Clean: '{keyword_clean}'")
-        
-        if not keyword_clean:
+        if not keyword:
             self.logger.debug("Empty keyword after cleaning")
             return
         
-        # Tìm trong database với keyword đã làm sạch
-        content = self.db.get_snippet(keyword_clean)
-        if not content:
-            # Thử tìm với keyword gốc
-            content = self.db.get_snippet(keyword)
-        
-        if content:
-            self.logger.info(f"✅ FOUND: '{keyword_clean}' → '{content[:50]}...'")
-            self.replace_text(keyword, content)
+        metrics.incr('triggers')
+        started = time.perf_counter()
+        match = self.find_match(keyword, self.get_buffer_state(keyword))
+        if not match:
+            match = self.find_raw_match(keyword)
+        metrics.record('lookup', time.perf_counter() - started)
+        if match:
+            metrics.incr('matches')
+            typed, matched_keyword, content = match
+            self.logger.debug("✅ FOUND: '%s' → '%.50s...'", typed, content)
+            self.replace_text(typed, content, triggered_at)
+            self.db.record_usage(matched_keyword)
         else:
-            self.logger.info(f"❌ NOT FOUND: '{keyword_clean}'")
+            self.logger.debug("❌ NOT FOUND: '%s'", keyword)
     
-    def remove_vietnamese_accents(self, text: str) -> str:
-        """Loại bỏ dấu tiếng Việt để tìm keyword"""
-        if not text:
-            return text
+    def find_match(self, text: str, state: int):
+        """Tìm snippet kết thúc ở cuối text, trả về (phần đã gõ, keyword, content)
         
-        # Bảng chuyển đổi dấu tiếng Việt
-        vietnamese_map = {
-            'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
-            'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
-            'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
-            'đ': 'd',
-            'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
-            'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
-            'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
-            'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
-            'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
-            'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
-            'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
-            'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
-            'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y',
-            'À': 'A', 'Á': 'A', 'Ả': 'A', 'Ã': 'A', 'Ạ': 'A',
-            'Ă': 'A', 'Ằ': 'A', 'Ắ': 'A', 'Ẳ': 'A', 'Ẵ': 'A', 'Ặ': 'A',
-            'Â': 'A', 'Ầ': 'A', 'Ấ': 'A', 'Ẩ': 'A', 'Ẫ': 'A', 'Ậ': 'A',
-            'Đ': 'D',
-            'È': 'E', 'É': 'E', 'Ẻ': 'E', 'Ẽ': 'E', 'Ẹ': 'E',
-            'Ê': 'E', 'Ề': 'E', 'Ế': 'E', 'Ể': 'E', 'Ễ': 'E', 'Ệ': 'E',
-            'Ì': 'I', 'Í': 'I', 'Ỉ': 'I', 'Ĩ': 'I', 'Ị': 'I',
-            'Ò': 'O', 'Ó': 'O', 'Ỏ': 'O', 'Õ': 'O', 'Ọ': 'O',
-            'Ô': 'O', 'Ồ': 'O', 'Ố': 'O', 'Ổ': 'O', 'Ỗ': 'O', 'Ộ': 'O',
-            'Ơ': 'O', 'Ờ': 'O', 'Ớ': 'O', 'Ở': 'O', 'Ỡ': 'O', 'Ợ': 'O',
-            'Ù': 'U', 'Ú': 'U', 'Ủ': 'U', 'Ũ': 'U', 'Ụ': 'U',
-            'Ư': 'U', 'Ừ': 'U', 'Ứ': 'U', 'Ử': 'U', 'Ữ': 'U', 'Ự': 'U',
-            'Ỳ': 'Y', 'Ý': 'Y', 'Ỷ': 'Y', 'Ỹ': 'Y', 'Ỵ': 'Y',
-        }
-        
-        result = []
-        for char in text:
-            if char in vietnamese_map:
-                result.append(vietnamese_map[char])
-            else:
-                result.append(char)
+        Keyword có thể là cả text hoặc hậu tố đứng sau ký tự phân cách
+        (vd "hello,cc" → "cc"). Ưu tiên keyword dài nhất.
+        """
+        for length in self.buffer.automaton.matches(state):
+            start = len(text) - length
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            typed = text[start:]
+            # QUAN TRỌNG: Xử lý tiếng Việt - một lần probe theo keyword đã bỏ dấu
+            found = self.db.lookup_folded(typed)
+            if found:
+                return (typed,) + found
+        return None
+    
+    def find_raw_match(self, text: str):
+        """Tìm theo các phím người dùng đã gõ (vd "dd" khi bộ gõ Telex đã đổi thành "đ")
         
-        return ''.join(result)
+        Nếu tìm thấy thì xóa đúng chữ đang hiện trên màn hình (text).
+        """
+        raw = self.composition.raw_word()
+        if not raw or raw == text or text != self.buffer.before_cursor():
+            return None
+        found = self.db.lookup_folded(raw)
+        if found:
+            self.logger.debug("⌨️ Matched raw keys '%s' for '%s'", raw, text)
+            return (text,) + found
+        return None
+    
+    def remove_vietnamese_accents(self, text: str) -> str:
+        """Loại bỏ dấu tiếng Việt để tìm keyword"""
+        return remove_accents(text)
     
     def type_unicode(self, text: str):
-        """Gõ text an toàn với Unicode"""
-        self.logger.debug(f"⌨️ Typing: '{text[:50]}...'")
-        for ch in text:
-            self.controller.press(ch)
-            self.controller.release(ch)
-            time.sleep(0.002)
+        """Gõ text an toàn với Unicode (từng phím)"""
+        self.logger.debug("⌨️ Typing: '%.50s...'", text)
+        self.injector.keys.type(text)
     
-    def replace_text(self, keyword: str, content: str):
-        """Xóa keyword và gõ content mới"""
-        if self.is_expanding:
-            self.logger.warning("Already expanding, skipping")
-            return
-            
-        self.is_expanding = True
+    def replace_text(self, keyword: str, content: str, triggered_at: float = None):
+        """Xóa keyword và gõ content mới
+        
+        Chỉ chạy trên worker thread, nên không bao giờ có hai lần thay thế
+        chồng nhau; phím đến trong lúc gõ nằm chờ trong hàng đợi.
+        """
+        if triggered_at is None:
+            triggered_at = time.perf_counter()
         
         try:
             # Chỉ xóa số ký tự bằng độ dài keyword (KHÔNG +1 cho space)
             # Vì space đã được trigger xử lý
             backspace_count = len(keyword)
-            self.logger.info(f"🔄 Replacing: '{keyword}' ({backspace_count} chars)")
+            app = foreground_app()
+            profile = self.pacer.profile(app)
+            injector = self.injector.select(content, app, profile)
+            self.logger.debug("🔄 Replacing: '%s' (%d chars) via %s | app='%s' delay=%.1fms",
+                              keyword, backspace_count, injector.name, app,
+                              profile.key_delay * 1000)
+            started = time.perf_counter()
+            self.controller.first_press_at = None
             
             # Xóa keyword
-            for i in range(backspace_count):
-                self.controller.press(Key.backspace)
-                self.controller.release(Key.backspace)
-                time.sleep(0.001)
+            injector.delete(backspace_count)
             
             # Gõ content mới
-            self.type_unicode(content)
+            injector.type(content)
             
-            self.logger.info(f"✅ DONE: '{keyword}' → '{content[:50]}...'")
+            finished = time.perf_counter()
+            elapsed = finished - started
+            if self.controller.first_press_at is not None:
+                metrics.record('trigger_to_first_key', self.controller.first_press_at - triggered_at)
+            metrics.record('trigger_to_done', finished - triggered_at)
+            metrics.incr('expansions')
+            self.pacer.record_expansion(app, backspace_count + len(content), elapsed)
+            self.logger.info("✅ DONE: '%s' → '%.50s...' (%.0fms, %.0f chars/s)",
+                             keyword, content, elapsed * 1000, profile.chars_per_sec)
             
         except Exception as e:
-            self.logger.error(f"❌ ERROR: {e}")
+            self.logger.error("❌ ERROR: %s", e)
         finally:
-            self.is_expanding = False
+            self.injection_ended = time.perf_counter()
             # QUAN TRỌNG: Xóa buffer sau khi thay thế xong
             self.clear_buffer()
     
@@ -263,12 +409,18 @@ class TextExpander:
         """Bật/tắt ứng dụng"""
         self.is_enabled = not self.is_enabled
         status = "BẬT" if self.is_enabled else "TẮT"
-        self.logger.info(f"🔘 TOGGLE: {status}")
+        self.logger.info("🔘 TOGGLE: %s", status)
         print(f"\n[APP] Text Expander {status}\n")
     
     def start(self):
         """Bắt đầu lắng nghe bàn phím"""
         self.logger.info("🎧 Starting keyboard listener...")
+        self.worker = threading.Thread(
+            target=self.process_events,
+            daemon=True,
+            name="ExpansionWorker"
+        )
+        self.worker.start()
         self.listener = keyboard.Listener(
             on_press=self.on_press,
             on_release=self.on_release
@@ -280,4 +432,12 @@ class TextExpander:
         """Dừng lắng nghe"""
         if hasattr(self, 'listener'):
             self.listener.stop()
-            self.logger.info("Keyboard listener stopped")
\ No newline at end of file
+            self.logger.info("Keyboard listener stopped")
+        if self.worker is not None:
+            self.events.put(None)
+            self.worker.join(timeout=2)
+            self.worker = None
+        self.db.index.unsubscribe(self.on_index_changed)
+        self.matcher_updater.close()
+        # Lưu tốc độ gõ đã học
+        self.pacer.close()
\ No newline at end of file
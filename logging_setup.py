@@ -0,0 +1,84 @@
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = 'text_expander.log'
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(threadName)s %(name)s: %(message)s'
+MAX_BYTES = 1024 * 1024   # 1MB mỗi file
+BACKUP_COUNT = 3          # giữ thêm 3 file cũ (.log.1 ... .log.3)
+
+_listener = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler không format message ở thread gọi log
+
+    QueueHandler mặc định format sẵn message trước khi đưa vào queue (để
+    record gửi được qua process khác). Queue ở đây nằm trong cùng process,
+    nên để thread ghi log format giúp hot path chỉ tốn một lần put().
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=None, log_file=LOG_FILE):
+    """Cấu hình log qua queue: thread gọi log chỉ đưa record vào queue,
+    thread nền format và ghi ra file (xoay vòng theo dung lượng) và console.
+
+    Gọi nhiều lần chỉ cấu hình một lần; các lần sau chỉ đổi mức log nếu có
+    truyền level. Mức log mặc định là INFO, hoặc DEBUG nếu đặt biến môi
+    trường TEXT_EXPANDER_DEBUG=1.
+    """
+    global _listener
+    if _listener is not None:
+        if level is not None:
+            set_verbosity(level)
+        return _listener
+
+    if level is None:
+        level = logging.DEBUG if os.environ.get('TEXT_EXPANDER_DEBUG') == '1' else logging.INFO
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding='utf-8'
+    )
+    file_handler.setFormatter(formatter)
+
+    # Cũng in ra console
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    # Mọi logger (logging.getLogger(__name__)) đều đi qua root
+    logging.getLogger().addHandler(DeferredQueueHandler(log_queue))
+
+    set_verbosity(level)
+    return _listener
+
+
+def set_verbosity(level):
+    """Đổi mức log lúc đang chạy (vd bật DEBUG khi cần gỡ lỗi)"""
+    logging.getLogger().setLevel(level)
+
+
+def is_debug() -> bool:
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
+
+
+def shutdown_logging():
+    """Ghi nốt các record còn trong queue rồi dừng thread ghi log"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
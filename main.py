@@ -1,57 +1,81 @@
+import time
+_STARTED = time.perf_counter()
+
 import sys
 import threading
 import os
-from PySide6.QtWidgets import *
-from PySide6.QtGui import *
-from PySide6.QtCore import *
+import logging
+from PySide6.QtWidgets import (
+    QApplication, QFileDialog, QMenu, QMessageBox, QStyle, QSystemTrayIcon
+)
+from PySide6.QtGui import QAction, QIcon
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from logging_setup import setup_logging, set_verbosity, is_debug
+from metrics import metrics
+from backup import BackupManager
+from database import Database
+
+# keyboard_listener (pynput) được import ở thread nền sau khi tray hiện,
+# manager_gui chỉ import khi mở cửa sổ quản lý lần đầu
 
 # ========== GLOBAL FLAGS ==========
-HAS_KEYBOARD = False
-HAS_GUI = False
+# None: chưa nạp, True/False: nạp được hay không
+HAS_KEYBOARD = None
+HAS_GUI = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(
+    sys.executable if getattr(sys, 'frozen', False) else __file__
+))
+ICON_PATHS = (
+    os.path.join(BASE_DIR, "resources", "icon.png"),
+    os.path.join(BASE_DIR, "resources", "icon.ico"),
+)
 
-# ========== IMPORT VÀ SET FLAGS ==========
-# Import keyboard_listener
-try:
-    from keyboard_listener import TextExpander
-    HAS_KEYBOARD = True
-    print("✅ Đã import keyboard_listener")
-except ImportError as e:
-    print(f"❌ Không import được keyboard_listener: {e}")
+logger = logging.getLogger(__name__)
+
+
+def _status(flag, ready, failed):
+    return "⏳ Đang nạp" if flag is None else (ready if flag else failed)
+
+
+# ========== ĐO THỜI GIAN KHỞI ĐỘNG ==========
+class StartupTimer:
+    """Ghi log thời gian từng giai đoạn khởi động (tổng tính từ lúc nạp main.py)"""
+    
+    def __init__(self, since=_STARTED):
+        self.last = since
+    
+    def phase(self, name):
+        now = time.perf_counter()
+        logger.info("⏱️ Khởi động | %-16s %7.1f ms (tổng %.1f ms)",
+                    name, (now - self.last) * 1000, (now - _STARTED) * 1000)
+        self.last = now
+
+
+class ServiceSignals(QObject):
+    # Thread khởi động báo về thread giao diện: (lỗi, rỗng nếu không có)
+    ready = Signal(str)
 
-# Import manager_gui
-try:
-    from manager_gui import SnippetManager
-    HAS_GUI = True
-    print("✅ Đã import manager_gui")
-except ImportError as e:
-    print(f"❌ Không import được manager_gui: {e}")
 
 # ========== CLASS SystemTrayApp ==========
 class SystemTrayApp:
     def __init__(self):
+        self.timer = StartupTimer()
+        self.timer.phase("import")
+        
         # Tạo QApplication - BẮT BUỘC phải tạo trước
         self.app = QApplication(sys.argv)
         self.app.setQuitOnLastWindowClosed(False)
         
         print("✅ Đã tạo QApplication")
+        self.timer.phase("QApplication")
         
-        # Tìm icon
-        icon_path = None
-        possible_paths = [
-            "resources/icon.png",
-            "resources/icon.ico",
-            os.path.join(os.path.dirname(__file__), "resources/icon.png"),
-            os.path.join(os.path.dirname(__file__), "resources/icon.ico"),
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                icon_path = path
-                print(f"✅ Tìm thấy icon: {path}")
-                break
+        # Tìm icon (cạnh file exe/mã nguồn, không phụ thuộc thư mục hiện tại)
+        icon_path = next((path for path in ICON_PATHS if os.path.exists(path)), None)
         
         # Tạo icon
-        if icon_path and os.path.exists(icon_path):
+        if icon_path:
             icon = QIcon(icon_path)
             if icon.isNull():
                 print("⚠️ Icon tồn tại nhưng không load được")
@@ -74,15 +98,15 @@ class SystemTrayApp:
         self.menu = QMenu()
         
         # Action: Mở quản lý
-        self.show_action = QAction("📝 Mở Quản lý", self.menu)
+        self.show_action = QAction("⏳ Đang mở database...", self.menu)
         self.show_action.triggered.connect(self.show_manager)
-        self.show_action.setEnabled(HAS_GUI)
+        self.show_action.setEnabled(False)  # bật khi database đã mở xong
         self.menu.addAction(self.show_action)
         
         # Action: Bật/Tắt
         self.toggle_action = QAction("✅ Bật", self.menu)
         self.toggle_action.triggered.connect(self.toggle_expander)
-        self.toggle_action.setEnabled(HAS_KEYBOARD)
+        self.toggle_action.setEnabled(False)  # bật khi listener sẵn sàng
         self.menu.addAction(self.toggle_action)
         
         self.menu.addSeparator()
@@ -92,6 +116,18 @@ class SystemTrayApp:
         self.stats_action.triggered.connect(self.show_stats)
         self.menu.addAction(self.stats_action)
         
+        # Action: Bật/tắt log chi tiết (DEBUG) lúc đang chạy
+        self.debug_action = QAction("🐞 Log chi tiết", self.menu)
+        self.debug_action.setCheckable(True)
+        self.debug_action.setChecked(is_debug())
+        self.debug_action.toggled.connect(self.toggle_debug_log)
+        self.menu.addAction(self.debug_action)
+        
+        # Action: Sao lưu ngay (chạy ở thread nền)
+        self.backup_action = QAction("💾 Sao lưu ngay", self.menu)
+        self.backup_action.triggered.connect(self.backup_now)
+        self.menu.addAction(self.backup_action)
+        
         self.menu.addSeparator()
         
         # Action: Thoát
@@ -105,24 +141,25 @@ class SystemTrayApp:
         # Kết nối sự kiện
         self.tray.activated.connect(self.on_tray_clicked)
         
-        # Khởi tạo keyboard listener (chỉ nếu import thành công)
+        # Database, index và keyboard listener được khởi tạo ở thread nền
+        # sau khi tray đã hiện (xem start_services)
+        self.db = None
         self.expander = None
         self.listener_thread = None
-        
-        if HAS_KEYBOARD:
-            try:
-                self.expander = TextExpander()
-                print("✅ Đã tạo TextExpander")
-            except Exception as e:
-                print(f"❌ Lỗi khởi tạo TextExpander: {e}")
+        self.backups = None
+        self.backup_action.setEnabled(False)
+        self.services = ServiceSignals()
+        self.services.ready.connect(self.on_services_ready)
         
         print("✅ Đã khởi tạo xong SystemTrayApp")
+        self.timer.phase("tray menu")
     
     def show(self):
         """Hiển thị tray icon"""
         if self.tray:
             self.tray.show()
             print("✅ Đã gọi tray.show()")
+            self.timer.phase("tray.show")
             
             # Hiển thị thông báo sau 1 giây
             QTimer.singleShot(1000, self.show_welcome_message)
@@ -144,15 +181,36 @@ class SystemTrayApp:
         if reason == QSystemTrayIcon.DoubleClick:
             self.show_manager()
     
+    def load_manager(self):
+        """Import manager_gui ở lần mở cửa sổ quản lý đầu tiên"""
+        global HAS_GUI
+        try:
+            from manager_gui import SnippetManager
+        except ImportError as e:
+            HAS_GUI = False
+            self.show_action.setEnabled(False)
+            print(f"❌ Không import được manager_gui: {e}")
+            return None
+        if HAS_GUI is None:
+            HAS_GUI = True
+            print("✅ Đã import manager_gui")
+        return SnippetManager
+    
     def show_manager(self):
         """Hiển thị cửa sổ quản lý"""
-        if not HAS_GUI:
+        if self.db is None:
+            # Double-click khi thread khởi động chưa mở xong database
+            print("⏳ Database đang mở, thử lại sau")
+            return
+        SnippetManager = self.load_manager()
+        if SnippetManager is None:
             QMessageBox.warning(None, "Lỗi", "Không thể mở trình quản lý!")
             return
         
         try:
             if not hasattr(self, 'manager_window') or not self.manager_window.isVisible():
-                self.manager_window = SnippetManager()
+                # Dùng chung instance mà thread khởi động đã mở
+                self.manager_window = SnippetManager(db=self.db)
                 self.manager_window.show()
                 print("✅ Đã mở cửa sổ quản lý")
             else:
@@ -184,32 +242,118 @@ class SystemTrayApp:
         if self.tray.supportsMessages():
             self.tray.showMessage(title, message, QSystemTrayIcon.Information, 2000)
     
+    def toggle_debug_log(self, enabled):
+        """Đổi mức log giữa DEBUG và INFO mà không cần khởi động lại"""
+        set_verbosity(logging.DEBUG if enabled else logging.INFO)
+        print(f"🐞 Log chi tiết: {'BẬT' if enabled else 'TẮT'}")
+    
     def show_stats(self):
         """Hiển thị thống kê"""
-        QMessageBox.information(
-            None,
-            "Thống kê",
+        box = QMessageBox()
+        box.setWindowTitle("Thống kê")
+        box.setIcon(QMessageBox.Information)
+        box.setText(
             f"Trạng thái ứng dụng:\n\n"
-            f"• Keyboard Listener: {'✅ Sẵn sàng' if HAS_KEYBOARD else '❌ Lỗi'}\n"
-            f"• GUI Manager: {'✅ Sẵn sàng' if HAS_GUI else '❌ Lỗi'}\n"
+            f"• Keyboard Listener: {_status(HAS_KEYBOARD, '✅ Sẵn sàng', '❌ Lỗi')}\n"
+            f"• GUI Manager: {_status(HAS_GUI, '✅ Sẵn sàng', '❌ Lỗi')}\n"
             f"• Tray Icon: {'✅ Hiển thị' if self.tray.isVisible() else '❌ Ẩn'}\n"
-            f"• Tray Available: {'✅ Có' if QSystemTrayIcon.isSystemTrayAvailable() else '❌ Không'}"
+            f"• Tray Available: {'✅ Có' if QSystemTrayIcon.isSystemTrayAvailable() else '❌ Không'}\n\n"
+            f"{metrics.report()}"
+        )
+        export_button = box.addButton("💾 Xuất số liệu", QMessageBox.ActionRole)
+        box.addButton(QMessageBox.Close)
+        box.exec()
+        
+        if box.clickedButton() == export_button:
+            self.export_stats()
+    
+    def export_stats(self):
+        """Xuất số liệu độ trễ ra file JSON/CSV"""
+        path, _ = QFileDialog.getSaveFileName(
+            None, "Xuất số liệu", "text_expander_metrics.json",
+            "JSON Files (*.json);;CSV Files (*.csv)"
         )
+        if not path:
+            return
+        try:
+            metrics.export(path)
+            self.show_message("Đã xuất", f"Đã lưu số liệu vào {path}")
+        except OSError as e:
+            QMessageBox.critical(None, "Lỗi", f"Không thể xuất số liệu: {e}")
     
-    def start_keyboard_listener(self):
-        """Bắt đầu keyboard listener"""
-        if HAS_KEYBOARD and self.expander and hasattr(self.expander, 'start'):
-            try:
-                # Tạo thread mới
-                self.listener_thread = threading.Thread(
-                    target=self.expander.start,
-                    daemon=True,
-                    name="KeyboardListener"
-                )
-                self.listener_thread.start()
-                print("✅ Đã bắt đầu keyboard listener")
-            except Exception as e:
-                print(f"❌ Lỗi khi start keyboard listener: {e}")
+    def backup_now(self):
+        """Chụp snapshot database ngay (không chặn giao diện)"""
+        if self.backups is None:
+            return
+        self.backups.backup_now()
+        self.show_message("Sao lưu", f"Đang sao lưu vào {self.backups.backup_dir}")
+    
+    def start_services(self):
+        """Mở database, nạp index và chạy keyboard listener ở thread nền"""
+        self.listener_thread = threading.Thread(
+            target=self._run_services,
+            daemon=True,
+            name="KeyboardListener"
+        )
+        self.listener_thread.start()
+    
+    def _run_services(self):
+        """Chạy trên thread nền: khởi tạo rồi chặn ở vòng lặp của listener"""
+        global HAS_KEYBOARD
+        timer = StartupTimer(time.perf_counter())
+        
+        # Một database dùng chung cho listener, cửa sổ quản lý và backup;
+        # lần mở đầu chạy migration và nạp index bộ nhớ
+        try:
+            self.db = Database.shared()
+        except Exception as e:
+            self.services.ready.emit(f"Lỗi mở database: {e}")
+            return
+        timer.phase("database + index")
+        
+        try:
+            from keyboard_listener import TextExpander
+        except ImportError as e:
+            HAS_KEYBOARD = False
+            self.services.ready.emit(f"Không import được keyboard_listener: {e}")
+            return
+        timer.phase("import listener")
+        
+        try:
+            self.expander = TextExpander(db=self.db)
+        except Exception as e:
+            HAS_KEYBOARD = False
+            self.services.ready.emit(f"Lỗi khởi tạo TextExpander: {e}")
+            return
+        HAS_KEYBOARD = True
+        timer.phase("TextExpander")
+        self.services.ready.emit("")
+        
+        try:
+            self.expander.start()
+        except Exception as e:
+            print(f"❌ Lỗi khi start keyboard listener: {e}")
+    
+    def on_services_ready(self, error):
+        """Trên thread giao diện, khi thread khởi động đã xong"""
+        if error:
+            print(f"❌ {error}")
+        else:
+            self.toggle_action.setEnabled(True)
+            print("✅ Đã bắt đầu keyboard listener")
+        
+        if self.db is not None and HAS_GUI is not False:
+            self.show_action.setText("📝 Mở Quản lý")
+            self.show_action.setEnabled(True)
+        elif self.db is None:
+            self.show_action.setText("📝 Mở Quản lý (lỗi database)")
+        
+        # Snapshot định kỳ và xuất thay đổi vào thư mục backups cạnh database
+        if self.db is not None and self.backups is None:
+            self.backups = BackupManager(self.db)
+            self.backups.start()
+            self.backup_action.setEnabled(True)
+        self.timer.phase("sẵn sàng")
     
     def quit_app(self):
         """Thoát ứng dụng"""
@@ -222,6 +366,16 @@ class SystemTrayApp:
         
         if reply == QMessageBox.Yes:
             print("🔄 Đang thoát ứng dụng...")
+            # Dừng listener và ghi nốt usage count còn trong hàng đợi
+            if self.backups:
+                self.backups.stop()
+            if self.expander:
+                try:
+                    self.expander.stop()
+                except Exception as e:
+                    print(f"❌ Lỗi khi dừng expander: {e}")
+            if self.db:
+                self.db.close()
             # Ẩn tray icon
             if self.tray:
                 self.tray.hide()
@@ -233,8 +387,9 @@ class SystemTrayApp:
         # Hiển thị tray icon
         self.show()
         
-        # Bắt đầu keyboard listener
-        self.start_keyboard_listener()
+        # Database, index và keyboard listener khởi tạo ở thread nền để tray
+        # hiện ngay
+        self.start_services()
         
         print("✅ Đang chạy Qt event loop...")
         # Chạy ứng dụng
@@ -249,6 +404,9 @@ def main():
     print(f"Current dir: {os.getcwd()}")
     print("=" * 50)
     
+    # Log ghi qua queue ở thread nền (file xoay vòng text_expander.log)
+    setup_logging()
+    
     # Tạo và chạy ứng dụng
     try:
         tray_app = SystemTrayApp()
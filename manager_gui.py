@@ -1,15 +1,320 @@
+import os
 import sys
+from bisect import bisect_left
 from PySide6.QtWidgets import *
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 from database import Database
+from snippet_io import SnippetReader, SnippetWriter
+
+class SearchSignals(QObject):
+    # (thế hệ truy vấn, kết quả)
+    finished = Signal(int, list)
+
+
+class SearchTask(QRunnable):
+    """Chạy Database.search_snippets trên thread của QThreadPool"""
+    
+    def __init__(self, db, text, generation, is_stale, limit):
+        super().__init__()
+        self.db = db
+        self.text = text
+        self.generation = generation
+        self.is_stale = is_stale
+        self.limit = limit
+        self.signals = SearchSignals()
+    
+    def run(self):
+        if self.is_stale():
+            return
+        try:
+            results = self.db.search_snippets(
+                self.text, limit=self.limit, markers=('«', '»'), cancelled=self.is_stale
+            )
+        except Exception as e:
+            print(f"❌ Lỗi tìm kiếm: {e}")
+            return
+        finally:
+            # Thread của QThreadPool không giữ kết nối giữa các tác vụ
+            self.db.release_connection()
+        if not self.is_stale():
+            self.signals.finished.emit(self.generation, results)
+
+
+class FileTaskSignals(QObject):
+    # Tiến độ theo phần nghìn của file
+    progress = Signal(int)
+    finished = Signal(dict)
+    failed = Signal(str)
+
+
+class ImportTask(QRunnable):
+    """Đọc file theo kiểu stream và import vào database ở thread nền"""
+    
+    def __init__(self, db, reader, policy):
+        super().__init__()
+        self.db = db
+        self.reader = reader
+        self.policy = policy
+        self.cancelled = False
+        self.signals = FileTaskSignals()
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def report_progress(self, processed):
+        size = self.reader.size or 1
+        self.signals.progress.emit(min(1000, self.reader.position() * 1000 // size))
+    
+    def run(self):
+        try:
+            counts = self.db.import_snippets(
+                self.reader, self.policy,
+                progress=self.report_progress,
+                cancelled=lambda: self.cancelled
+            )
+            counts['invalid'] = self.reader.invalid
+            self.signals.finished.emit(counts)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        finally:
+            self.reader.close()
+            self.db.release_connection()
+
+
+class ExportTask(QRunnable):
+    """Ghi snippets ra file ở thread nền, đọc database theo từng lô"""
+    
+    PROGRESS_EVERY = 500
+    
+    def __init__(self, db, path):
+        super().__init__()
+        self.db = db
+        self.path = path
+        self.cancelled = False
+        self.signals = FileTaskSignals()
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def run(self):
+        try:
+            total = self.db.count_snippets() or 1
+            with SnippetWriter(self.path) as writer:
+                for row in self.db.iter_snippets():
+                    if self.cancelled:
+                        break
+                    writer.write(row)
+                    if writer.count % self.PROGRESS_EVERY == 0:
+                        self.signals.progress.emit(min(1000, writer.count * 1000 // total))
+        except Exception as e:
+            self._remove_partial()
+            self.signals.failed.emit(str(e))
+            return
+        finally:
+            self.db.release_connection()
+        if self.cancelled:
+            self._remove_partial()
+        self.signals.finished.emit({'exported': writer.count, 'cancelled': self.cancelled})
+    
+    def _remove_partial(self):
+        """Không để lại file export dở dang"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class SnippetChangeBridge(QObject):
+    """Chuyển thông báo thay đổi của Database (có thể từ thread khác) sang Qt signal"""
+    # (event, keyword)
+    changed = Signal(str, object)
+    
+    def notify(self, event, keyword):
+        self.changed.emit(event, keyword)
+
+
+class SnippetListModel(QAbstractListModel):
+    """Danh sách snippets nạp dần theo trang khi cuộn tới
+    
+    Mỗi dòng chỉ giữ (keyword, preview, usage_count, last_used); content đầy
+    đủ chỉ được đọc khi chọn snippet. View gọi canFetchMore/fetchMore khi
+    cuộn gần cuối nên mở cửa sổ chỉ tốn một trang dù có bao nhiêu snippet.
+    """
+    
+    PAGE_SIZE = 200
+    
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.rows = []
+        # keyword → usage_count của các dòng đã nạp (để tìm nhị phân)
+        self._usages = {}
+        self.exhausted = False
+        # Đang hiện kết quả tìm kiếm (không phân trang)
+        self.searching = False
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        keyword, preview, usage, _ = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{keyword} ({usage} lần) - {' '.join(preview.split())}"
+        if role == Qt.UserRole:
+            return keyword
+        if role == Qt.ForegroundRole:
+            # Tô màu theo mức độ sử dụng
+            if usage > 20:
+                return QColor("#4CAF50")  # Xanh lá
+            if usage > 5:
+                return QColor("#FF9800")  # Cam
+        return None
+    
+    def row_data(self, row):
+        """(keyword, preview, usage_count, last_used) của dòng"""
+        return self.rows[row]
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        after = None
+        if self.rows:
+            last = self.rows[-1]
+            after = (last[2], last[0])
+        page = self.db.get_snippet_page(after, self.PAGE_SIZE)
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        for r in page:
+            self.rows.append((r['keyword'], r['preview'], r['usage_count'], r['last_used']))
+            self._usages[r['keyword']] = r['usage_count']
+        self.endInsertRows()
+    
+    def reload(self):
+        """Bỏ các trang đã nạp, nạp lại từ đầu"""
+        self.beginResetModel()
+        self.rows = []
+        self._usages = {}
+        self.exhausted = False
+        self.searching = False
+        self.endResetModel()
+        self.fetchMore()
+    
+    @staticmethod
+    def _sort_key(row):
+        return (-row[2], row[0])
+    
+    def find_row(self, keyword):
+        """Vị trí dòng của keyword trong các dòng đã nạp (-1 nếu chưa nạp)"""
+        if not self.searching:
+            usage = self._usages.get(keyword)
+            if usage is not None:
+                # Danh sách đã sắp xếp: tìm nhị phân theo (usage, keyword)
+                row = bisect_left(self.rows, (-usage, keyword), key=self._sort_key)
+                if row < len(self.rows) and self.rows[row][0] == keyword:
+                    return row
+        for row, data in enumerate(self.rows):
+            if data[0] == keyword:
+                return row
+        return -1
+    
+    def apply_change(self, event, keyword, content=None):
+        """Áp dụng một thay đổi của database vào đúng một dòng
+        
+        Chèn/xóa dòng bằng beginInsertRows/beginRemoveRows nên view giữ nguyên
+        dòng đang chọn và vị trí cuộn.
+        """
+        if event == 'load':
+            if not self.searching:
+                self.reload()
+            return
+        
+        row = self.find_row(keyword)
+        if event == 'remove':
+            if row >= 0:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[row]
+                self._usages.pop(keyword, None)
+                self.endRemoveRows()
+            return
+        
+        preview = (content or '')[:self.db.PREVIEW_LENGTH]
+        if row >= 0:
+            # Sửa nội dung: thứ tự (usage_count, keyword) không đổi
+            _, _, usage, last_used = self.rows[row]
+            self.rows[row] = (keyword, preview, usage, last_used)
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+            return
+        
+        if event == 'add' and not self.searching:
+            # Snippet mới có usage_count = 0: chèn đúng vị trí sắp xếp; nằm
+            # sau trang cuối đã nạp thì để fetchMore nạp sau
+            new_row = (keyword, preview, 0, None)
+            row = bisect_left(self.rows, self._sort_key(new_row), key=self._sort_key)
+            if row == len(self.rows) and not self.exhausted:
+                return
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.rows.insert(row, new_row)
+            self._usages[keyword] = 0
+            self.endInsertRows()
+    
+    def show_results(self, results):
+        """Hiện kết quả tìm kiếm thay cho danh sách phân trang"""
+        self.beginResetModel()
+        self.rows = [
+            (r['keyword'], r['content_snippet'], r['usage_count'], r['last_used'])
+            for r in results
+        ]
+        self._usages = {}
+        self.exhausted = True
+        self.searching = True
+        self.endResetModel()
+
 
 class SnippetManager(QMainWindow):
-    def __init__(self, db_path="snippets.db"):
+    # Số kết quả tìm kiếm tối đa hiển thị
+    SEARCH_LIMIT = 500
+    # Chờ người dùng ngừng gõ bao lâu (ms) rồi mới tìm
+    SEARCH_DEBOUNCE_MS = 150
+    
+    def __init__(self, db_path=None, db=None):
         super().__init__()
-        self.db = Database(db_path)
+        # Dùng chung database của process: mở cửa sổ không khởi tạo lại schema
+        self.db = db or Database.shared(db_path)
+        
+        # Tìm kiếm chạy nền: mỗi lần gõ tăng search_generation, truy vấn cũ
+        # thấy thế hệ của mình đã cũ thì tự hủy, kết quả cũ bị bỏ qua
+        self.search_generation = 0
+        self.search_pool = QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.start_search)
+        
+        # Import/export file chạy nền, mỗi lần một việc
+        self.io_pool = QThreadPool(self)
+        self.io_pool.setMaxThreadCount(1)
+        self.io_task = None
+        self.io_progress = None
+        
         self.init_ui()
         self.load_snippets()
+        
+        # Thay đổi snippets (từ cửa sổ này hay nơi khác) được áp dụng từng dòng
+        self.changes = SnippetChangeBridge(self)
+        self.changes.changed.connect(self.on_snippet_changed)
+        self.db.subscribe(self.changes.notify)
     
     def init_ui(self):
         self.setWindowTitle("Quản lý Tin nhắn Nhanh")
@@ -43,8 +348,12 @@ class SnippetManager(QMainWindow):
         left_layout = QVBoxLayout(left_widget)
         
         left_layout.addWidget(QLabel("📋 Danh sách snippets:"))
-        self.snippet_list = QListWidget()
-        self.snippet_list.itemClicked.connect(self.on_item_selected)
+        self.snippet_model = SnippetListModel(self.db, self)
+        self.snippet_list = QListView()
+        # Mọi dòng cao bằng nhau: view không phải đo từng dòng khi cuộn
+        self.snippet_list.setUniformItemSizes(True)
+        self.snippet_list.setModel(self.snippet_model)
+        self.snippet_list.selectionModel().currentChanged.connect(self.on_item_selected)
         left_layout.addWidget(self.snippet_list)
         
         # Right: Detail widget
@@ -112,11 +421,11 @@ class SnippetManager(QMainWindow):
         # File menu
         file_menu = menubar.addMenu("📁 File")
         
-        import_action = QAction("Import từ JSON", self)
+        import_action = QAction("Import (JSON/JSONL/CSV)", self)
         import_action.triggered.connect(self.import_snippets)
         file_menu.addAction(import_action)
         
-        export_action = QAction("Export ra JSON", self)
+        export_action = QAction("Export (JSON/JSONL/CSV)", self)
         export_action.triggered.connect(self.export_snippets)
         file_menu.addAction(export_action)
         
@@ -134,66 +443,90 @@ class SnippetManager(QMainWindow):
         help_menu.addAction(about_action)
     
     def load_snippets(self):
-        """Load tất cả snippets vào list"""
-        self.snippet_list.clear()
-        snippets = self.db.get_all_snippets()
-        
-        for snippet in snippets:
-            keyword = snippet['keyword']
-            content = snippet['content']
-            usage = snippet['usage_count']
-            last_used = snippet['last_used'] or "Chưa dùng"
-            
-            item_text = f"{keyword} ({usage} lần) - {content[:40]}..."
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, keyword)  # Lưu keyword vào item
-            
-            # Tô màu theo mức độ sử dụng
-            if usage > 20:
-                item.setForeground(QColor("#4CAF50"))  # Xanh lá
-            elif usage > 5:
-                item.setForeground(QColor("#FF9800"))  # Cam
-            
-            self.snippet_list.addItem(item)
-        
-        self.total_label.setText(f"Tổng: {len(snippets)} snippets")
+        """Load trang đầu của danh sách (các trang sau nạp khi cuộn tới)"""
+        self.snippet_model.reload()
+        self.total_count = self.db.count_snippets()
+        self.update_total_label()
+    
+    def update_total_label(self):
+        self.total_label.setText(f"Tổng: {self.total_count} snippets")
+    
+    def on_snippet_changed(self, event, keyword):
+        """Database vừa thêm/sửa/xóa một snippet: cập nhật đúng dòng đó"""
+        if event == 'load':
+            self.total_count = self.db.count_snippets()
+        elif event == 'add':
+            self.total_count += 1
+        elif event == 'remove':
+            self.total_count -= 1
+        self.update_total_label()
+        
+        content = self.db.index.get(keyword) if keyword is not None else None
+        self.snippet_model.apply_change(event, keyword, content)
+        if self.snippet_model.searching and event in ('add', 'load'):
+            # Snippet mới có thể khớp truy vấn đang hiện: tìm lại
+            self.search_timer.start()
     
     def on_search(self, text):
-        """Tìm kiếm real-time"""
+        """Tìm kiếm real-time (chờ ngừng gõ rồi tìm ở thread nền)"""
+        self.search_generation += 1
         if not text:
+            self.search_timer.stop()
             self.load_snippets()
             return
+        self.search_timer.start()
+    
+    def start_search(self):
+        """Gửi truy vấn mới nhất cho thread pool"""
+        generation = self.search_generation
+        task = SearchTask(
+            self.db,
+            self.search_input.text(),
+            generation,
+            lambda: generation != self.search_generation,
+            self.SEARCH_LIMIT
+        )
+        task.signals.finished.connect(self.on_search_results)
+        # Bỏ các truy vấn còn xếp hàng; truy vấn đang chạy tự hủy vì đã cũ
+        self.search_pool.clear()
+        self.search_pool.start(task)
+        self.statusBar().showMessage("🔍 Đang tìm...")
+    
+    def on_search_results(self, generation, results):
+        """Hiển thị kết quả (chỉ của truy vấn mới nhất)"""
+        if generation != self.search_generation:
+            return
         
-        self.snippet_list.clear()
-        results = self.db.search_snippets(text)
-        
-        for snippet in results:
-            keyword = snippet['keyword']
-            content = snippet['content']
-            usage = snippet['usage_count']
-            
-            item_text = f"{keyword} ({usage} lần) - {content[:40]}..."
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, keyword)
-            self.snippet_list.addItem(item)
+        self.snippet_model.show_results(results)
+        self.statusBar().showMessage(f"Tìm thấy {len(results)} snippets")
+    
+    def closeEvent(self, event):
+        """Hủy truy vấn đang chạy trước khi đóng cửa sổ"""
+        self.db.unsubscribe(self.changes.notify)
+        self.search_timer.stop()
+        self.search_generation += 1
+        self.search_pool.clear()
+        self.search_pool.waitForDone()
+        if self.io_task is not None:
+            self.io_task.cancel()
+        self.io_pool.waitForDone()
+        super().closeEvent(event)
     
-    def on_item_selected(self, item):
-        """Khi chọn một item trong list"""
-        keyword = item.data(Qt.UserRole)
-        content = self.db.get_snippet(keyword)
+    def on_item_selected(self, current, previous=None):
+        """Khi chọn một item trong list: lúc này mới đọc toàn bộ content"""
+        if not current.isValid():
+            return
+        keyword = self.snippet_model.row_data(current.row())[0]
+        # Chỉ đọc: xem snippet không làm tăng usage count
+        record = self.db.get_snippet_record(keyword)
         
-        if content:
+        if record:
             self.keyword_input.setText(keyword)
-            self.content_input.setPlainText(content)
+            self.content_input.setPlainText(record['content'])
             
             # Hiển thị stats
-            snippets = self.db.get_all_snippets()
-            for s in snippets:
-                if s['keyword'] == keyword:
-                    usage = s['usage_count']
-                    last_used = s['last_used'] or "Chưa dùng"
-                    self.stats_label.setText(f"Đã dùng: {usage} lần | Lần cuối: {last_used}")
-                    break
+            last_used = record['last_used'] or "Chưa dùng"
+            self.stats_label.setText(f"Đã dùng: {record['usage_count']} lần | Lần cuối: {last_used}")
     
     def save_snippet(self):
         """Lưu snippet mới hoặc cập nhật"""
@@ -205,9 +538,9 @@ class SnippetManager(QMainWindow):
             return
         
         # Kiểm tra nếu keyword đã tồn tại
-        existing_content = self.db.get_snippet(keyword)
+        existing = self.db.get_snippet_record(keyword)
         
-        if existing_content:
+        if existing:
             # Cập nhật
             reply = QMessageBox.question(
                 self, "Xác nhận",
@@ -218,14 +551,12 @@ class SnippetManager(QMainWindow):
             if reply == QMessageBox.Yes:
                 if self.db.update_snippet(keyword, content):
                     self.statusBar().showMessage(f"Đã cập nhật: {keyword}")
-                    self.load_snippets()
                 else:
                     QMessageBox.critical(self, "Lỗi", "Không thể cập nhật!")
         else:
             # Thêm mới
             if self.db.add_snippet(keyword, content):
                 self.statusBar().showMessage(f"Đã thêm mới: {keyword}")
-                self.load_snippets()
             else:
                 QMessageBox.critical(self, "Lỗi", "Không thể thêm mới!")
     
@@ -247,7 +578,6 @@ class SnippetManager(QMainWindow):
             if self.db.delete_snippet(keyword):
                 self.statusBar().showMessage(f"Đã xóa: {keyword}")
                 self.new_snippet()
-                self.load_snippets()
             else:
                 QMessageBox.critical(self, "Lỗi", "Không thể xóa!")
     
@@ -258,43 +588,117 @@ class SnippetManager(QMainWindow):
         self.stats_label.setText("Chưa chọn snippet")
         self.keyword_input.setFocus()
     
+    EXPORT_FILTERS = (
+        "JSON Files (*.json);;JSON Lines (*.jsonl);;CSV Files (*.csv);;"
+        "JSON nén (*.json.gz);;JSON Lines nén (*.jsonl.gz);;CSV nén (*.csv.gz)"
+    )
+    
     def export_snippets(self):
-        """Export snippets ra file JSON"""
+        """Export snippets (kèm usage_count, thời gian) ra JSON/JSONL/CSV, có thể nén gzip"""
+        if self.io_task is not None:
+            QMessageBox.information(self, "Export", "Đang import/export, vui lòng chờ!")
+            return
+        
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Export Snippets", "", "JSON Files (*.json)"
+            self, "Export Snippets", "", self.EXPORT_FILTERS
         )
+        if not file_path:
+            return
         
-        if file_path:
-            snippets = self.db.get_all_snippets()
-            import json
-            
-            data = {}
-            for snippet in snippets:
-                data[snippet['keyword']] = snippet['content']
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            QMessageBox.information(self, "Thành công", f"Đã export {len(data)} snippets!")
+        task = ExportTask(self.db, file_path)
+        self.start_file_task(task, "Export", "Đang export snippets...")
+        task.signals.finished.connect(self.on_export_finished)
+        self.statusBar().showMessage("📤 Đang export...")
+    
+    def on_export_finished(self, result):
+        self._end_file_task()
+        if result['cancelled']:
+            self.statusBar().showMessage("Đã hủy export")
+            return
+        self.statusBar().showMessage("Export xong")
+        QMessageBox.information(self, "Thành công", f"Đã export {result['exported']} snippets!")
+    
+    # Lựa chọn khi keyword đã tồn tại → policy của Database.import_snippets
+    IMPORT_POLICIES = {
+        "Bỏ qua keyword đã có": 'skip',
+        "Ghi đè keyword đã có": 'overwrite',
+        "Đổi tên (keyword_2, keyword_3...)": 'rename',
+    }
     
     def import_snippets(self):
-        """Import snippets từ file JSON"""
+        """Import snippets từ file JSON/JSONL/CSV, có thể nén .gz (chạy nền, có thanh tiến độ)"""
+        if self.io_task is not None:
+            QMessageBox.information(self, "Import", "Đang import/export, vui lòng chờ!")
+            return
+        
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Import Snippets", "", "JSON Files (*.json)"
+            self, "Import Snippets", "",
+            "Snippets (*.json *.jsonl *.ndjson *.csv *.gz);;JSON Files (*.json *.json.gz);;"
+            "JSON Lines (*.jsonl *.ndjson *.jsonl.gz);;CSV Files (*.csv *.csv.gz)"
         )
+        if not file_path:
+            return
         
-        if file_path:
-            import json
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            count = 0
-            for keyword, content in data.items():
-                if self.db.add_snippet(keyword, content):
-                    count += 1
-            
-            QMessageBox.information(self, "Thành công", f"Đã import {count} snippets!")
-            self.load_snippets()
+        choice, ok = QInputDialog.getItem(
+            self, "Import Snippets", "Khi keyword đã tồn tại:",
+            list(self.IMPORT_POLICIES), 0, False
+        )
+        if not ok:
+            return
+        
+        try:
+            reader = SnippetReader(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Lỗi", f"Không mở được file: {e}")
+            return
+        
+        task = ImportTask(self.db, reader, self.IMPORT_POLICIES[choice])
+        self.start_file_task(task, "Import", "Đang import snippets...")
+        task.signals.finished.connect(self.on_import_finished)
+        self.statusBar().showMessage("📥 Đang import...")
+    
+    def start_file_task(self, task, title, text):
+        """Chạy import/export ở thread nền với hộp tiến độ không modal"""
+        task.signals.progress.connect(self.on_file_task_progress)
+        task.signals.failed.connect(self.on_file_task_failed)
+        
+        # Không modal: vẫn xem/tìm snippets được trong lúc chạy
+        self.io_progress = QProgressDialog(text, "Hủy", 0, 1000, self)
+        self.io_progress.setWindowTitle(title)
+        self.io_progress.setWindowModality(Qt.NonModal)
+        self.io_progress.setMinimumDuration(0)
+        self.io_progress.canceled.connect(task.cancel)
+        self.io_progress.show()
+        
+        self.io_task = task
+        self.io_pool.start(task)
+    
+    def on_file_task_progress(self, value):
+        if self.io_progress is not None:
+            self.io_progress.setValue(value)
+    
+    def _end_file_task(self):
+        self.io_task = None
+        if self.io_progress is not None:
+            self.io_progress.close()
+            self.io_progress = None
+    
+    def on_file_task_failed(self, error):
+        self._end_file_task()
+        QMessageBox.critical(self, "Lỗi", f"Không thể import/export: {error}")
+    
+    def on_import_finished(self, counts):
+        self._end_file_task()
+        if counts['cancelled']:
+            self.statusBar().showMessage("Đã hủy import, không có thay đổi nào")
+            return
+        
+        message = (f"Đã import {counts['added']} snippets mới!\n"
+                   f"• Ghi đè: {counts['updated']}\n"
+                   f"• Đổi tên: {counts['renamed']}\n"
+                   f"• Bỏ qua: {counts['skipped'] + counts['invalid']}")
+        self.statusBar().showMessage("Import xong")
+        QMessageBox.information(self, "Thành công", message)
     
     def show_about(self):
         """Hiển thị thông tin về ứng dụng"""
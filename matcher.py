@@ -0,0 +1,315 @@
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+
+class Automaton:
+    """Một phiên bản của automaton, không bao giờ bị sửa sau khi được publish
+
+    Người đọc (worker thread) giữ một Automaton và chỉ dùng state của chính
+    nó, nên dù matcher đang được dựng lại ở thread khác, các mảng luôn khớp
+    với nhau và với các state đã lưu.
+    """
+
+    __slots__ = ('children', 'depth', 'fail', 'output', 'version', 'normalize')
+
+    ROOT = 0
+
+    def __init__(self, children, depth, fail, output, version, normalize):
+        self.children = children
+        self.depth = depth
+        self.fail = fail
+        self.output = output    # node terminal gần nhất trên chuỗi fail (0 = không có)
+        self.version = version
+        self.normalize = normalize
+
+    def step(self, state: int, ch: str) -> int:
+        """Chuyển state theo một ký tự (O(1) trung bình)"""
+        ch = self.normalize(ch)
+        children = self.children
+        fail = self.fail
+        while True:
+            nxt = children[state].get(ch)
+            if nxt is not None:
+                return nxt
+            if state == self.ROOT:
+                return self.ROOT
+            state = fail[state]
+
+    def feed(self, text: str, state: int = ROOT) -> int:
+        """Chạy cả đoạn text từ state cho trước"""
+        for ch in text:
+            state = self.step(state, ch)
+        return state
+
+    def clamp(self, state: int, length: int) -> int:
+        """Lùi state theo failure link đến khi độ sâu không vượt quá length
+
+        Dùng khi đầu buffer bị cắt bớt: state của phần còn lại chính là
+        hậu tố dài nhất (trên chuỗi fail) ngắn hơn hoặc bằng độ dài mới.
+        """
+        depth = self.depth
+        fail = self.fail
+        while depth[state] > length:
+            state = fail[state]
+        return state
+
+    def matches(self, state: int) -> Iterator[int]:
+        """Độ dài các keyword kết thúc tại state, dài nhất trước"""
+        depth = self.depth
+        fail = self.fail
+        output = self.output
+        node = output[state]
+        while node:
+            yield depth[node]
+            node = output[fail[node]]
+
+
+class KeywordMatcher:
+    """Automaton Aho-Corasick trên tập keyword, chạy từng ký tự khi gõ phím
+
+    Mỗi state là một node trong trie, ứng với hậu tố dài nhất của đoạn đã gõ
+    đồng thời là tiền tố của một keyword. Người dùng giữ state của riêng mình
+    và gọi step() cho mỗi ký tự; khi có trigger, matches() liệt kê độ dài các
+    keyword kết thúc ở vị trí hiện tại (dài nhất trước).
+
+    Thay đổi keyword chỉ chép các node trên đường đi của keyword mới, tính lại
+    failure link rồi publish cả Automaton bằng một phép gán, nên thread đang
+    đọc không bao giờ thấy trie dở dang. Tính failure link vẫn duyệt cả trie:
+    gom nhiều thay đổi vào một lần update() và gọi từ thread nền (xem
+    MatcherUpdater). Người đọc cần dùng nhiều lần liên tiếp (state ở lần này
+    đưa vào lần sau) phải giữ cùng một `automaton`; mỗi lần publish `version`
+    tăng lên.
+    """
+
+    ROOT = Automaton.ROOT
+    # Tỉ lệ node "chết" (không còn keyword nào đi qua) trước khi dựng lại trie
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, keywords: Iterable[str] = (),
+                 normalize: Optional[Callable[[str], str]] = None):
+        self.normalize = normalize or (lambda text: text)
+        self._lock = threading.Lock()
+        self.automaton = Automaton([{}], [0], [0], [0], 0, self.normalize)
+        self._terminal = [0]   # số keyword kết thúc tại node (chỉ writer dùng)
+        self._keywords = {}    # keyword đã chuẩn hóa -> các keyword gốc
+        self._dead_keywords = 0
+        with self._lock:
+            self._load(keywords)
+
+    @property
+    def version(self) -> int:
+        return self.automaton.version
+
+    # ========== DỰNG TRIE (giữ self._lock) ==========
+    @staticmethod
+    def _insert(trie, keyword: str, copied: Optional[set] = None):
+        """Thêm keyword vào trie; copied là các node đã được chép trong lô này
+
+        Node cũ (dùng chung với Automaton đang publish) được chép trước khi
+        thêm con, nên chỉ các node trên đường đi bị chép.
+        """
+        children, depth, terminal = trie
+        node = Automaton.ROOT
+        for ch in keyword:
+            nxt = children[node].get(ch)
+            if nxt is None:
+                if copied is not None and node not in copied:
+                    children[node] = dict(children[node])
+                    copied.add(node)
+                nxt = len(children)
+                children.append({})
+                depth.append(depth[node] + 1)
+                terminal.append(0)
+                children[node][ch] = nxt
+                if copied is not None:
+                    copied.add(nxt)
+            node = nxt
+        terminal[node] += 1
+
+    def _build_trie(self):
+        """Trie mới từ self._keywords (không còn node chết)"""
+        trie = ([{}], [0], [0])
+        for keyword in self._keywords:
+            self._insert(trie, keyword)
+        self._dead_keywords = 0
+        return trie
+
+    def _load(self, keywords: Iterable[str]):
+        originals = {}
+        for keyword in keywords:
+            normalized = self.normalize(keyword)
+            if normalized:
+                originals.setdefault(normalized, set()).add(keyword)
+        self._keywords = originals
+        self._publish(self._build_trie())
+
+    def _publish(self, trie):
+        """Tính failure link và output link bằng BFS rồi publish Automaton mới"""
+        children, depth, terminal = trie
+        fail = [0] * len(children)
+        output = [0] * len(children)
+        queue = list(children[self.ROOT].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            output[node] = node if terminal[node] else output[fail[node]]
+            for ch, child in children[node].items():
+                state = fail[node]
+                while state and ch not in children[state]:
+                    state = fail[state]
+                target = children[state].get(ch, self.ROOT)
+                fail[child] = target if target != child else self.ROOT
+                queue.append(child)
+        self._terminal = terminal
+        self.automaton = Automaton(children, depth, fail, output,
+                                   self.automaton.version + 1, self.normalize)
+
+    # ========== THAY ĐỔI KEYWORD ==========
+    def update(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Thêm/xóa nhiều keyword gốc rồi publish một Automaton cho cả lô
+
+        Thêm keyword đã có hay xóa keyword không có đều bỏ qua, nên gọi lặp
+        lại với cùng thay đổi không làm sai trạng thái.
+        """
+        with self._lock:
+            current = self.automaton
+            trie = (list(current.children), list(current.depth), list(self._terminal))
+            copied = set()
+            changed = False
+            for keyword in added:
+                normalized = self.normalize(keyword)
+                if not normalized:
+                    continue
+                originals = self._keywords.setdefault(normalized, set())
+                if keyword in originals:
+                    continue
+                originals.add(keyword)
+                changed = True
+                if len(originals) == 1:
+                    self._insert(trie, normalized, copied)
+            for keyword in removed:
+                normalized = self.normalize(keyword)
+                originals = self._keywords.get(normalized)
+                if not originals or keyword not in originals:
+                    continue
+                originals.discard(keyword)
+                changed = True
+                if originals:
+                    continue
+                del self._keywords[normalized]
+                self._dead_keywords += 1
+                # Trie giữ nguyên, chỉ node cuối thôi là terminal
+                children, _, terminal = trie
+                node = self.ROOT
+                for ch in normalized:
+                    node = children[node][ch]
+                terminal[node] -= 1
+            if not changed:
+                return
+            if self._dead_keywords > len(self._keywords) * self.COMPACT_RATIO:
+                trie = self._build_trie()
+            self._publish(trie)
+
+    def add(self, keyword: str):
+        """Thêm một keyword (gom nhiều thay đổi thì dùng update)"""
+        self.update(added=(keyword,))
+
+    def remove(self, keyword: str):
+        """Xóa một keyword; node thừa được dọn khi vượt ngưỡng COMPACT_RATIO"""
+        self.update(removed=(keyword,))
+
+    def rebuild(self, keywords: Iterable[str]):
+        """Dựng lại toàn bộ automaton"""
+        with self._lock:
+            self._load(keywords)
+
+    # ========== ĐỌC (mỗi lần gọi dùng một Automaton) ==========
+    def step(self, state: int, ch: str) -> int:
+        return self.automaton.step(state, ch)
+
+    def feed(self, text: str, state: int = ROOT) -> int:
+        return self.automaton.feed(text, state)
+
+    def clamp(self, state: int, length: int) -> int:
+        return self.automaton.clamp(state, length)
+
+    def matches(self, state: int) -> Iterator[int]:
+        return self.automaton.matches(state)
+
+    def __len__(self):
+        return len(self._keywords)
+
+
+class MatcherUpdater:
+    """Áp dụng thay đổi keyword vào KeywordMatcher ở thread nền
+
+    Callback của index có thể chạy trên thread giao diện (lưu snippet trong
+    cửa sổ quản lý), nên chỉ đánh dấu keyword đã đổi rồi đánh thức thread
+    nền. Thread nền gom các thay đổi, đối chiếu lại với nguồn (keyword còn
+    hay không) và publish một Automaton cho cả lô. Vì đối chiếu theo trạng
+    thái hiện tại của nguồn nên thứ tự và số lần nhận sự kiện không quan trọng.
+    """
+
+    def __init__(self, matcher: KeywordMatcher, keywords: Callable[[], Iterable[str]],
+                 contains: Callable[[str], bool]):
+        self.matcher = matcher
+        self._keywords = keywords
+        self._contains = contains
+        self._dirty = set()
+        self._reload = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def changed(self, keyword: str):
+        """Keyword vừa được thêm hoặc xóa (không chờ dựng automaton)"""
+        with self._lock:
+            self._dirty.add(keyword)
+            self._start()
+        self._wake.set()
+
+    def reload(self):
+        """Nguồn vừa được nạp lại toàn bộ"""
+        with self._lock:
+            self._reload = True
+            self._start()
+        self._wake.set()
+
+    def _start(self):
+        if self._thread is None and not self._stopped.is_set():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="MatcherUpdater")
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Lỗi khi cập nhật matcher: {e}")
+
+    def flush(self):
+        """Áp dụng ngay các thay đổi đang chờ trên thread gọi"""
+        with self._flush_lock:
+            with self._lock:
+                dirty, reload = self._dirty, self._reload
+                self._dirty = set()
+                self._reload = False
+            if reload:
+                self.matcher.rebuild(self._keywords())
+            if dirty:
+                added = {keyword for keyword in dirty if self._contains(keyword)}
+                self.matcher.update(added, dirty - added)
+
+    def close(self):
+        """Dừng thread nền và áp dụng phần còn lại"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
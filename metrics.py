@@ -0,0 +1,190 @@
+import csv
+import json
+import math
+import threading
+import time
+from typing import Dict
+
+
+class LatencyHistogram:
+    """Histogram độ trễ với các bucket tăng theo cấp số nhân
+
+    Mỗi bucket rộng hơn bucket trước GROWTH lần (sai số percentile ~5%), từ
+    1µs tới vài phút, nên bộ nhớ cố định dù ghi bao nhiêu mẫu và record()
+    chỉ là một phép log + cộng.
+    """
+
+    GROWTH = 1.1
+    MIN_SECONDS = 1e-6
+    BUCKETS = 240
+
+    def __init__(self):
+        self._log_growth = math.log(self.GROWTH)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        index = int(math.log(seconds / self.MIN_SECONDS) / self._log_growth) + 1
+        return min(index, self.BUCKETS - 1)
+
+    def _upper(self, index: int) -> float:
+        """Cận trên của bucket"""
+        return self.MIN_SECONDS * self.GROWTH ** index
+
+    def record(self, seconds: float):
+        self.counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Giá trị (giây) mà p% số mẫu không vượt quá"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # Không báo vượt quá giá trị thật lớn/nhỏ nhất đã thấy
+                return min(max(self._upper(index), self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Thống kê tính bằng mili giây"""
+        if not self.count:
+            return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0,
+                    'p99_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class Metrics:
+    """Số liệu đo trên hot path: histogram độ trễ và bộ đếm
+
+    Thread nào cũng ghi được (worker, GUI, usage writer); mỗi lần ghi chỉ
+    giữ khóa trong vài phép cộng.
+    """
+
+    # Tên histogram → mô tả hiển thị trong hộp thoại thống kê
+    LATENCIES = {
+        'key_queue': 'Phím chờ trong hàng đợi',
+        'key_handling': 'Xử lý một phím',
+        'lookup': 'Tìm snippet khi trigger',
+        'trigger_to_first_key': 'Trigger → phím đầu tiên',
+        'trigger_to_done': 'Trigger → gõ xong',
+        'index_lookup': 'Tra cứu index bộ nhớ',
+    }
+
+    COUNTERS = {
+        'keys': 'Phím đã xử lý',
+        'dropped_keys': 'Phím bị mất (lỗi khi xử lý)',
+        'triggers': 'Lần trigger có chữ',
+        'matches': 'Lần tìm thấy snippet',
+        'expansions': 'Lần thay thế',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.histograms = {name: LatencyHistogram() for name in self.LATENCIES}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            for histogram in self.histograms.values():
+                histogram.reset()
+            for name in self.counters:
+                self.counters[name] = 0
+
+    def record(self, name: str, seconds: float):
+        """Ghi một mẫu độ trễ (giây)"""
+        with self._lock:
+            self.histograms[name].record(seconds)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self) -> dict:
+        """Bản chụp toàn bộ số liệu (dùng để hiển thị và xuất file)"""
+        with self._lock:
+            triggers = self.counters['triggers']
+            return {
+                'started': self.started,
+                'uptime_sec': time.time() - self.started,
+                'latency': {name: h.summary() for name, h in self.histograms.items()},
+                'counters': dict(self.counters),
+                'match_ratio': self.counters['matches'] / triggers if triggers else None,
+            }
+
+    def report(self) -> str:
+        """Tóm tắt dạng text cho hộp thoại thống kê"""
+        data = self.snapshot()
+        lines = ["Độ trễ (p50 / p95 / p99 ms, số mẫu):"]
+        for name, label in self.LATENCIES.items():
+            s = data['latency'][name]
+            if s['count']:
+                lines.append(f"• {label}: {s['p50_ms']:.2f} / {s['p95_ms']:.2f} / "
+                             f"{s['p99_ms']:.2f} ({s['count']})")
+            else:
+                lines.append(f"• {label}: chưa có dữ liệu")
+
+        counters = data['counters']
+        lines.append("")
+        lines.append(f"• Phím đã xử lý: {counters['keys']} (mất {counters['dropped_keys']})")
+        lines.append(f"• Thay thế: {counters['expansions']}")
+        match_ratio = data['match_ratio']
+        if match_ratio is not None:
+            lines.append(f"• Trigger tìm thấy snippet: {match_ratio * 100:.1f}%")
+        return "\n".join(lines)
+
+    def export_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path: str):
+        """Mỗi dòng một số liệu: histogram có đủ cột, bộ đếm chỉ có cột value"""
+        data = self.snapshot()
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['metric', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms',
+                             'max_ms', 'value'])
+            for name, s in data['latency'].items():
+                writer.writerow([name, s['count'], f"{s['mean_ms']:.3f}", f"{s['p50_ms']:.3f}",
+                                 f"{s['p95_ms']:.3f}", f"{s['p99_ms']:.3f}",
+                                 f"{s['max_ms']:.3f}", ''])
+            for name, value in data['counters'].items():
+                writer.writerow([name, '', '', '', '', '', '', value])
+            for name in ('match_ratio', 'uptime_sec'):
+                value = data[name]
+                writer.writerow([name, '', '', '', '', '', '', '' if value is None else f"{value:.4f}"])
+
+    def export(self, path: str):
+        """Xuất theo phần mở rộng của file (.csv hoặc JSON)"""
+        if path.lower().endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+
+# Số liệu dùng chung cho cả process
+metrics = Metrics()
@@ -0,0 +1,191 @@
+import sqlite3
+from typing import Callable, List, Tuple
+
+from vietnamese import remove_accents
+
+# Mỗi migration là (phiên bản, mô tả, hàm(conn)), theo thứ tự tăng dần. Phiên
+# bản đã áp dụng lưu trong PRAGMA user_version của file database nên mỗi bước
+# chỉ chạy một lần. Chỉ thêm bước mới vào cuối, không sửa bước đã phát hành.
+#
+# Database tạo trước khi có cơ chế này có user_version = 0 nhưng có thể đã có
+# sẵn một phần schema, nên các bước đầu phải chạy được trên cả hai trường hợp.
+
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _create_snippets(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS snippets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        keyword TEXT UNIQUE NOT NULL,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        usage_count INTEGER DEFAULT 0,
+        last_used TIMESTAMP
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_keyword ON snippets(keyword)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_usage ON snippets(usage_count)')
+
+
+def _add_keyword_folded(conn):
+    """Cột keyword đã bỏ dấu để so khớp khi gõ không dấu"""
+    if 'keyword_folded' not in _columns(conn, 'snippets'):
+        conn.execute("ALTER TABLE snippets ADD COLUMN keyword_folded TEXT")
+        rows = conn.execute("SELECT id, keyword FROM snippets").fetchall()
+        conn.executemany(
+            "UPDATE snippets SET keyword_folded = ? WHERE id = ?",
+            [(remove_accents(keyword), snippet_id) for snippet_id, keyword in rows]
+        )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_keyword_folded ON snippets(keyword_folded)')
+
+
+def _create_fts(conn):
+    """Bảng FTS5 snippets_fts (external content) và trigger đồng bộ
+
+    Tokenizer unicode61 bỏ dấu (remove_diacritics 2) nên "chao" tìm được
+    "chào"; riêng "đ" không phải dấu, được xử lý lúc tạo câu truy vấn. Nếu
+    SQLite không có FTS5 thì bỏ qua (tìm kiếm dùng LIKE).
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snippets_fts'"
+    ).fetchone()
+    try:
+        conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(
+            keyword, content,
+            content='snippets', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Không dùng được FTS5, tìm kiếm bằng LIKE: {e}")
+        return
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS snippets_fts_insert AFTER INSERT ON snippets BEGIN
+        INSERT INTO snippets_fts(rowid, keyword, content)
+        VALUES (new.id, new.keyword, new.content);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS snippets_fts_delete AFTER DELETE ON snippets BEGIN
+        INSERT INTO snippets_fts(snippets_fts, rowid, keyword, content)
+        VALUES ('delete', old.id, old.keyword, old.content);
+    END
+    ''')
+    # Chỉ khi keyword/content đổi; cập nhật usage_count không đụng tới FTS
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS snippets_fts_update AFTER UPDATE OF keyword, content ON snippets BEGIN
+        INSERT INTO snippets_fts(snippets_fts, rowid, keyword, content)
+        VALUES ('delete', old.id, old.keyword, old.content);
+        INSERT INTO snippets_fts(rowid, keyword, content)
+        VALUES (new.id, new.keyword, new.content);
+    END
+    ''')
+
+    if not exists:
+        # Đánh chỉ mục các snippet đã có
+        conn.execute("INSERT INTO snippets_fts(snippets_fts) VALUES ('rebuild')")
+
+
+def _create_typing_profiles(conn):
+    """Tốc độ gõ đã học cho từng ứng dụng"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS typing_profiles (
+        app TEXT PRIMARY KEY,
+        key_delay REAL NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        expansions INTEGER DEFAULT 0,
+        corrections INTEGER DEFAULT 0,
+        chars_per_sec REAL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def _add_updated_at(conn):
+    """Thời điểm thay đổi gần nhất, cho backup tăng dần
+
+    ALTER TABLE không cho DEFAULT CURRENT_TIMESTAMP nên mọi câu ghi đều đặt
+    rõ giá trị.
+    """
+    if 'updated_at' not in _columns(conn, 'snippets'):
+        conn.execute("ALTER TABLE snippets ADD COLUMN updated_at TIMESTAMP")
+        conn.execute("UPDATE snippets SET updated_at = COALESCE(last_used, created_at)")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_updated_at ON snippets(updated_at)')
+
+
+def _index_usage_keyword(conn):
+    """Index theo đúng thứ tự của danh sách (usage_count DESC, keyword)
+
+    Danh sách, get_most_used và phân trang đọc theo index thay vì sắp xếp cả
+    bảng. idx_keyword trùng với index của ràng buộc UNIQUE, idx_usage bị index
+    mới bao trọn: bỏ cả hai để mỗi lần ghi usage bớt cập nhật index.
+    """
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_usage_keyword ON snippets(usage_count DESC, keyword)'
+    )
+    conn.execute('DROP INDEX IF EXISTS idx_keyword')
+    conn.execute('DROP INDEX IF EXISTS idx_usage')
+
+
+def _drop_keyword_folded_index(conn):
+    """Bỏ idx_keyword_folded
+
+    Tra cứu theo keyword bỏ dấu đi qua index bộ nhớ (SnippetIndex), còn
+    reload_index đọc cả bảng, nên không truy vấn nào dùng index này; giữ lại
+    chỉ tốn thêm một lần ghi index mỗi lần thêm/import snippet. Cột
+    keyword_folded vẫn giữ để nạp index bộ nhớ không phải bỏ dấu lại.
+    """
+    conn.execute('DROP INDEX IF EXISTS idx_keyword_folded')
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "Bảng snippets", _create_snippets),
+    (2, "Cột keyword_folded", _add_keyword_folded),
+    (3, "Chỉ mục full-text snippets_fts", _create_fts),
+    (4, "Bảng typing_profiles", _create_typing_profiles),
+    (5, "Cột updated_at", _add_updated_at),
+    (6, "Index (usage_count DESC, keyword)", _index_usage_keyword),
+    (7, "Bỏ index idx_keyword_folded", _drop_keyword_folded_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Áp dụng các migration còn thiếu, trả về số bước đã chạy
+
+    Mỗi bước chạy trong một transaction riêng cùng với việc tăng user_version,
+    nên lỗi giữa chừng không để lại schema dở dang và lần sau chạy tiếp từ
+    bước đó. Database đã mới nhất chỉ tốn một lần đọc PRAGMA.
+    """
+    if schema_version(conn) >= LATEST_VERSION:
+        return 0
+
+    applied = 0
+    for version, description, upgrade in MIGRATIONS:
+        # BEGIN IMMEDIATE giữ khóa ghi: process khác đang nâng cấp cùng lúc
+        # thì chờ, rồi đọc lại phiên bản để không chạy lặp
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            print(f"🔧 Nâng cấp database lên phiên bản {version}: {description}")
+            upgrade(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied += 1
+    return applied
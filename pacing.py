@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from pynput.keyboard import Key
+
+
+@dataclass
+class TypingProfile:
+    """Thông số gõ đã học cho một ứng dụng"""
+    app: str
+    key_delay: float = 0.002      # nghỉ giữa các phím (0 = gõ liền không nghỉ)
+    chunk_size: int = 32          # số ký tự mỗi khối khi gõ theo khối
+    expansions: int = 0
+    corrections: int = 0
+    chars_per_sec: float = 0.0    # tốc độ gõ đo được (trung bình trượt)
+    clean_streak: int = 0         # số lần thay thế liên tiếp không bị sửa
+
+
+class AdaptivePacer:
+    """Tự điều chỉnh tốc độ gõ theo từng ứng dụng đang active
+
+    Ứng dụng làm rơi ký tự thường khiến người dùng sửa ngay sau khi thay thế
+    (Ctrl+Z hoặc xóa liên tiếp nhiều ký tự). Mỗi lần như vậy độ trễ được nhân
+    đôi và khối gõ giảm một nửa; sau một chuỗi lần thay thế không bị sửa thì
+    tăng tốc dần, cho tới khi gõ liền không nghỉ.
+
+    Hot path chỉ cập nhật profile trong bộ nhớ và đánh dấu thay đổi; thread
+    nền lưu xuống database mỗi SAVE_INTERVAL giây (hoặc ngay sau khi phải gõ
+    chậm lại), close() lưu nốt phần còn lại.
+    """
+
+    MIN_DELAY = 0.0
+    MAX_DELAY = 0.03
+    MIN_CHUNK = 4
+    MAX_CHUNK = 128
+
+    CORRECTION_WINDOW = 2.0    # giây sau khi thay thế được tính là "sửa lại"
+    CORRECTION_BACKSPACES = 3  # số backspace trong cửa sổ được tính là sửa
+    SPEEDUP_AFTER = 5          # số lần thay thế sạch trước khi tăng tốc
+    SPEEDUP_FACTOR = 0.75
+    THROUGHPUT_SMOOTHING = 0.3
+    SAVE_INTERVAL = 30.0
+
+    def __init__(self, db=None):
+        self.db = db
+        self._profiles: Dict[str, TypingProfile] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # Lần thay thế gần nhất để nhận biết người dùng sửa lại
+        self._last_app: Optional[str] = None
+        self._last_expansion_at = 0.0
+        self._backspaces = 0
+        self._load()
+
+    def _load(self):
+        if self.db is None:
+            return
+        for row in self.db.get_typing_profiles():
+            self._profiles[row['app']] = TypingProfile(
+                app=row['app'],
+                key_delay=row['key_delay'],
+                chunk_size=row['chunk_size'],
+                expansions=row['expansions'],
+                corrections=row['corrections'],
+                chars_per_sec=row['chars_per_sec'],
+            )
+
+    def profile(self, app: str) -> TypingProfile:
+        """Lấy profile của ứng dụng (tạo mới với thông số mặc định)"""
+        with self._lock:
+            profile = self._profiles.get(app)
+            if profile is None:
+                profile = self._profiles[app] = TypingProfile(app=app)
+            return profile
+
+    def profiles(self) -> List[TypingProfile]:
+        with self._lock:
+            return list(self._profiles.values())
+
+    def record_expansion(self, app: str, chars: int, elapsed: float):
+        """Ghi nhận một lần thay thế: cập nhật tốc độ gõ và tăng tốc nếu ổn định"""
+        profile = self.profile(app)
+        with self._lock:
+            profile.expansions += 1
+            if elapsed > 0 and chars > 0:
+                rate = chars / elapsed
+                if profile.chars_per_sec:
+                    alpha = self.THROUGHPUT_SMOOTHING
+                    profile.chars_per_sec += alpha * (rate - profile.chars_per_sec)
+                else:
+                    profile.chars_per_sec = rate
+
+            profile.clean_streak += 1
+            if profile.clean_streak >= self.SPEEDUP_AFTER:
+                profile.clean_streak = 0
+                profile.key_delay = max(self.MIN_DELAY, profile.key_delay * self.SPEEDUP_FACTOR)
+                if profile.key_delay < 0.0005:
+                    profile.key_delay = 0.0
+                profile.chunk_size = min(self.MAX_CHUNK, profile.chunk_size * 2)
+
+            self._mark_dirty(app)
+            self._last_app = app
+            self._last_expansion_at = time.monotonic()
+            self._backspaces = 0
+
+    def _expired(self) -> bool:
+        """Đã ra ngoài cửa sổ theo dõi lần thay thế gần nhất chưa"""
+        if self._last_app is None:
+            return True
+        if time.monotonic() - self._last_expansion_at > self.CORRECTION_WINDOW:
+            self._last_app = None
+            return True
+        return False
+
+    def observe_key(self, key, modifiers=()):
+        """Theo dõi Ctrl+Z ngay sau khi thay thế"""
+        if self._expired():
+            return
+        undo = getattr(key, 'char', None) in ('z', 'Z', '\x1a') and (
+            Key.ctrl in modifiers or Key.ctrl_l in modifiers or Key.ctrl_r in modifiers
+        )
+        if undo:
+            self.record_correction(self._last_app)
+
+    def observe_backspace(self):
+        """Người dùng xóa vào chữ vừa thay thế
+
+        Chỉ gọi cho backspace của người dùng (không phải loạt sửa của bộ gõ
+        tiếng Việt) khi đã xóa hết phần gõ thêm sau lần thay thế.
+        """
+        if self._expired():
+            return
+        self._backspaces += 1
+        if self._backspaces >= self.CORRECTION_BACKSPACES:
+            self.record_correction(self._last_app)
+
+    def record_correction(self, app: str):
+        """Ứng dụng có vẻ làm rơi ký tự: gõ chậm lại"""
+        profile = self.profile(app)
+        with self._lock:
+            profile.corrections += 1
+            profile.clean_streak = 0
+            profile.key_delay = min(self.MAX_DELAY, max(profile.key_delay * 2, 0.001))
+            profile.chunk_size = max(self.MIN_CHUNK, profile.chunk_size // 2)
+            self._mark_dirty(app)
+            self._last_app = None
+        # Lưu sớm thay vì chờ hết SAVE_INTERVAL
+        self._wake.set()
+
+    # ========== LƯU NỀN ==========
+    def _mark_dirty(self, app: str):
+        """Đánh dấu profile cần lưu (gọi khi đang giữ _lock)"""
+        self._dirty.add(app)
+        if self._thread is None and self.db is not None and not self._stopped.is_set():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="PacerSaver")
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.SAVE_INTERVAL)
+            self._wake.clear()
+            self.save()
+
+    def save(self) -> int:
+        """Lưu các profile đã thay đổi vào database, trả về số profile đã lưu"""
+        with self._save_lock:
+            with self._lock:
+                dirty = self._dirty
+                self._dirty = set()
+                rows = [
+                    (p.app, p.key_delay, p.chunk_size, p.expansions, p.corrections, p.chars_per_sec)
+                    for p in (self._profiles[app] for app in dirty)
+                ]
+            if self.db is None or not rows:
+                return 0
+            try:
+                self.db.save_typing_profiles(rows)
+            except sqlite3.OperationalError as e:
+                # Database đang bị khóa: đánh dấu lại để lần sau lưu tiếp
+                print(f"Không lưu được tốc độ gõ, sẽ thử lại: {e}")
+                with self._lock:
+                    self._dirty |= dirty
+                return 0
+            return len(rows)
+
+    def close(self):
+        """Dừng thread nền và lưu phần còn lại"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.save()
@@ -0,0 +1,140 @@
+"""Kiểm tra EXPLAIN QUERY PLAN của các truy vấn trong Database
+
+Gọi từng method của Database trên một database tạm, ghi lại các câu SQL nó
+chạy (qua set_trace_callback) rồi xem plan của từng câu. Báo lỗi nếu truy
+vấn phải sắp xếp bằng B-tree tạm hoặc quét cả bảng ở chỗ lẽ ra dùng index:
+
+    python query_plans.py            # in kết quả, exit code 1 nếu có lỗi
+    python query_plans.py -v         # in cả plan của các truy vấn đạt
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from database import Database
+
+# Quy tắc cho plan
+NO_SORT = 'không sắp xếp bằng B-tree tạm'
+NO_SCAN = 'không quét bảng/index (phải SEARCH)'
+
+
+def violations(plan, rules):
+    """Các quy tắc mà plan (danh sách dòng detail) vi phạm"""
+    failed = []
+    if NO_SORT in rules and any('USE TEMP B-TREE' in line for line in plan):
+        failed.append(NO_SORT)
+    if NO_SCAN in rules and any(line.startswith('SCAN') for line in plan):
+        failed.append(NO_SCAN)
+    return failed
+
+
+def explain(conn, sql):
+    """Các dòng detail của EXPLAIN QUERY PLAN (thụt lề theo cây)"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    depth = {0: 0}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, 0) + 1
+        lines.append('  ' * (depth[node] - 1) + detail)
+    return [line.strip() for line in lines], lines
+
+
+def fill(db, count, seed=1):
+    rng = random.Random(seed)
+    db.import_snippets({
+        'keyword': f"kw{i}",
+        'content': f"nội dung mẫu số {i} " + ' '.join(
+            rng.choice(('xin', 'chào', 'địa', 'chỉ', 'email', 'cảm', 'ơn')) for _ in range(8)
+        ),
+        'usage_count': rng.randint(0, 50),
+    } for i in range(count))
+
+
+def checks(db):
+    """(tên, hàm gọi Database, quy tắc) cho mọi method có truy vấn"""
+    keyword = 'kw7'
+    return [
+        ('get_snippet (không có trong index)', lambda: db.get_snippet('không-có'), {NO_SCAN}),
+        ('get_snippet_record(keyword)', lambda: db.get_snippet_record(keyword), {NO_SCAN}),
+        ('get_snippet_record(snippet_id)', lambda: db.get_snippet_record(snippet_id=7), {NO_SCAN}),
+        ('get_snippet_records', lambda: db.get_snippet_records([keyword, 'kw8']), {NO_SCAN}),
+        ('update_snippet', lambda: db.update_snippet(keyword, 'mới'), {NO_SCAN}),
+        ('record_usage + flush_usage',
+         lambda: (db.record_usage(keyword), db.flush_usage()), {NO_SCAN}),
+        ('delete_snippet', lambda: db.delete_snippet('kw9'), {NO_SCAN}),
+        ('get_all_snippets', db.get_all_snippets, {NO_SORT}),
+        ('get_snippet_page (trang đầu)', lambda: db.get_snippet_page(limit=50), {NO_SORT}),
+        ('get_snippet_page (trang sau)', lambda: db.get_snippet_page((20, 'kw5'), 50),
+         {NO_SORT, NO_SCAN}),
+        ('get_most_used', db.get_most_used, {NO_SORT}),
+        ('iter_snippets', lambda: list(db.iter_snippets()), {NO_SORT}),
+        ('iter_snippets(since)', lambda: list(db.iter_snippets(since='2100-01-01 00:00:00')),
+         {NO_SORT, NO_SCAN}),
+        ('count_snippets', db.count_snippets, set()),
+        # bm25 chỉ tính được sau khi khớp nên FTS luôn phải sắp xếp
+        ('search_snippets (FTS5)', lambda: db.search_snippets('chao', limit=20), set()),
+        ('search_snippets (LIKE)', lambda: db.search_snippets('—', limit=20), {NO_SORT}),
+        ('reload_index', db.reload_index, set()),
+        ('get_typing_profiles', db.get_typing_profiles, set()),
+    ]
+
+
+def captured_statements(conn, call):
+    """Các câu SQL (đã thay tham số) mà call chạy trên kết nối conn"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    seen = []
+    for sql in statements:
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        # Bỏ câu trong trigger (-- TRIGGER), BEGIN/COMMIT, PRAGMA
+        if head in ('SELECT', 'UPDATE', 'DELETE', 'WITH') and sql not in seen:
+            seen.append(sql)
+    return seen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-v', '--verbose', action='store_true', help='in cả plan của truy vấn đạt')
+    parser.add_argument('--rows', type=int, default=2000, help='số snippets mẫu (mặc định 2000)')
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='query_plans_')
+    failures = 0
+    try:
+        db = Database(os.path.join(directory, 'plans.db'))
+        fill(db, args.rows)
+        conn = db.get_connection()
+        for name, call, rules in checks(db):
+            statements = captured_statements(conn, call)
+            if not statements:
+                print(f"⚠️ {name}: không chạy câu SQL nào")
+                continue
+            for sql in statements:
+                plan, tree = explain(conn, sql)
+                failed = violations(plan, rules)
+                status = '❌' if failed else '✅'
+                print(f"{status} {name}")
+                if failed or args.verbose:
+                    print('   ' + ' '.join(sql.split()))
+                    for line in tree:
+                        print(f"     {line}")
+                for rule in failed:
+                    print(f"   → vi phạm: {rule}")
+                failures += bool(failed)
+        db.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\n{'❌' if failures else '✅'} {failures} truy vấn vi phạm")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import csv
+import gzip
+import io
+import json
+import os
+from typing import Iterator, Optional
+
+# Các cột của một snippet khi import/export
+FIELDS = ('keyword', 'content', 'usage_count', 'created_at', 'last_used')
+
+
+def is_gzip(path: str) -> bool:
+    return path.lower().endswith('.gz')
+
+
+def detect_format(path: str) -> str:
+    """Định dạng theo phần mở rộng (bỏ qua .gz): .jsonl/.ndjson, .csv, còn lại là JSON"""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return 'json'
+
+
+def _record(data) -> Optional[dict]:
+    """Chuẩn hóa một bản ghi đọc được; None nếu không phải snippet"""
+    if not isinstance(data, dict):
+        return None
+    keyword = data.get('keyword')
+    content = data.get('content')
+    if not isinstance(keyword, str) or not isinstance(content, str):
+        return None
+    record = {'keyword': keyword, 'content': content}
+    usage = data.get('usage_count')
+    if usage not in (None, ''):
+        try:
+            record['usage_count'] = int(usage)
+        except (TypeError, ValueError):
+            pass
+    for field in ('created_at', 'last_used'):
+        if data.get(field):
+            record[field] = str(data[field])
+    return record
+
+
+class SnippetReader:
+    """Đọc snippets từ file JSON/JSONL/CSV (có thể nén .gz) theo kiểu stream
+
+    JSON được parse từng phần tử bằng JSONDecoder.raw_decode trên một buffer
+    trượt, nên file lớn không bị nạp hết vào bộ nhớ. Hỗ trợ cả định dạng cũ
+    {keyword: content} lẫn danh sách [{"keyword": ..., "content": ...}].
+
+        with SnippetReader(path) as reader:
+            for record in reader:
+                ...
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.format = fmt or detect_format(path)
+        self.size = os.path.getsize(path)
+        self.invalid = 0  # số phần tử bỏ qua vì không phải snippet
+        self._raw = open(path, 'rb')
+        stream = gzip.GzipFile(fileobj=self._raw) if is_gzip(path) else self._raw
+        self._file = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._raw.close()
+
+    def position(self) -> int:
+        """Số byte đã đọc (của file nén nếu là .gz, để báo tiến độ)"""
+        try:
+            return self._raw.tell()
+        except (ValueError, OSError):
+            return self.size
+
+    def __iter__(self) -> Iterator[dict]:
+        if self.format == 'jsonl':
+            records = self._read_jsonl()
+        elif self.format == 'csv':
+            records = csv.DictReader(self._file)
+        else:
+            records = self._read_json()
+        for data in records:
+            record = _record(data)
+            if record is None:
+                self.invalid += 1
+                continue
+            yield record
+
+    def _read_jsonl(self):
+        for number, line in enumerate(self._file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Dòng {number} không phải JSON hợp lệ: {e}") from None
+
+    # ========== JSON STREAM ==========
+    def _read_json(self):
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+        opening = self._next_char()
+        if opening == '{':
+            # Định dạng cũ: {keyword: content}
+            for keyword, content in self._members('}', keyed=True):
+                yield {'keyword': keyword, 'content': content}
+        elif opening == '[':
+            yield from self._members(']', keyed=False)
+        elif opening is not None:
+            raise ValueError("File JSON phải là object {keyword: content} hoặc danh sách snippet")
+
+    def _fill(self) -> bool:
+        """Đọc thêm một đoạn vào buffer; False nếu đã hết file"""
+        if self._eof:
+            return False
+        chunk = self._file.read(self.CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        # Bỏ phần đã parse để buffer không phình theo kích thước file
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _next_char(self) -> Optional[str]:
+        """Ký tự khác khoảng trắng tiếp theo (không tiêu thụ nó)"""
+        while True:
+            buffer = self._buffer
+            while self._pos < len(buffer) and buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(buffer):
+                return buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, chars: str) -> str:
+        ch = self._next_char()
+        if ch is None or ch not in chars:
+            raise ValueError(f"JSON không hợp lệ: cần một trong '{chars}', gặp {ch!r}")
+        self._pos += 1
+        return ch
+
+    def _value(self):
+        """Parse một giá trị JSON hoàn chỉnh, đọc thêm nếu buffer bị cắt ngang"""
+        self._next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise ValueError("File JSON bị cắt ngang hoặc không hợp lệ") from None
+            if end == len(self._buffer) and not self._eof:
+                # Số ở cuối buffer có thể còn chữ số ở đoạn sau: đọc thêm cho chắc
+                if self._fill():
+                    continue
+            self._pos = end
+            return value
+
+    def _members(self, closing: str, keyed: bool):
+        self._pos += 1  # bỏ qua '{' hoặc '['
+        if self._next_char() == closing:
+            self._pos += 1
+            return
+        while True:
+            if keyed:
+                key = self._value()
+                self._expect(':')
+                yield key, self._value()
+            else:
+                yield self._value()
+            if self._expect(',' + closing) == closing:
+                return
+
+
+class SnippetWriter:
+    """Ghi snippets ra file JSON/JSONL/CSV từng bản ghi một (nén gzip nếu tên file là .gz)
+
+    JSON là danh sách các bản ghi đầy đủ metadata (FIELDS), mỗi bản ghi một
+    dòng; SnippetReader đọc lại được mọi định dạng.
+
+        with SnippetWriter(path) as writer:
+            for row in db.iter_snippets():
+                writer.write(row)
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.format = fmt or detect_format(path)
+        self.count = 0
+        if is_gzip(path):
+            self._file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(FIELDS)
+        elif self.format == 'json':
+            self._file.write('[')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, row):
+        """Ghi một snippet (dict hoặc sqlite3.Row có các cột FIELDS)"""
+        values = [row[field] for field in FIELDS]
+        if self._csv is not None:
+            self._csv.writerow(['' if value is None else value for value in values])
+        else:
+            line = json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False)
+            if self.format == 'json':
+                line = ('\n' if not self.count else ',\n') + line
+            else:
+                line += '\n'
+            self._file.write(line)
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.format == 'json':
+            self._file.write('\n]\n' if self.count else ']\n')
+        self._file.close()
@@ -0,0 +1,28 @@
+# Bảng bỏ dấu tiếng Việt, dựng một lần khi import module
+_ACCENTS = {
+    'a': 'àáảãạăằắẳẵặâầấẩẫậ',
+    'd': 'đ',
+    'e': 'èéẻẽẹêềếểễệ',
+    'i': 'ìíỉĩị',
+    'o': 'òóỏõọôồốổỗộơờớởỡợ',
+    'u': 'ùúủũụưừứửữự',
+    'y': 'ỳýỷỹỵ',
+    'A': 'ÀÁẢÃẠĂẰẮẲẴẶÂẦẤẨẪẬ',
+    'D': 'Đ',
+    'E': 'ÈÉẺẼẸÊỀẾỂỄỆ',
+    'I': 'ÌÍỈĨỊ',
+    'O': 'ÒÓỎÕỌÔỒỐỔỖỘƠỜỚỞỠỢ',
+    'U': 'ÙÚỦŨỤƯỪỨỬỮỰ',
+    'Y': 'ỲÝỶỸỴ',
+}
+
+_ACCENT_TABLE = str.maketrans({
+    accented: base
+    for base, chars in _ACCENTS.items()
+    for accented in chars
+})
+
+
+def remove_accents(text: str) -> str:
+    """Loại bỏ dấu tiếng Việt (giữ nguyên độ dài chuỗi)"""
+    return text.translate(_ACCENT_TABLE) if text else text